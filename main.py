@@ -1,7 +1,7 @@
 from src.strategy import StrategyOptimizer
 
 # We test with FERRARI because they have average tire wear (good benchmark)
-optimizer = StrategyOptimizer(team="Ferrari", track="Bahrain", total_laps=57)
+optimizer = StrategyOptimizer(team="Ferrari", track="Bahrain")
 
 print("--- STARTING STRATEGY OPTIMIZATION (WITH TIRE CLIFF) ---")
 
@@ -1,17 +1,34 @@
+import os
 import pandas as pd
-import sklearn
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
+from src.params import DATA_DIR
+from src.lap_store import load_laps
+
+# Tyre wear plot for one race, run from the repo root:
+#   python -m src.analysis
+PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
 
 # CONSTANTS (We assume these based on F1 physics literature)
 # Fuel correction: Cars gain approx 0.05s per lap due to fuel burn (weight loss)
 FUEL_CORRECTION_PER_LAP = 0.05
 
 
-def analyze_tire_wear(file_path):
-    print(f"Analyzing {file_path}...")
-    df = pd.read_csv(file_path)
+# Columns needed from the columnar store
+WEAR_COLUMNS = ['LapNumber', 'LapTimeSec', 'TyreLife', 'Compound']
+
+
+def analyze_tire_wear(file_path=None, year=None, gp=None):
+    # sklearn / matplotlib only load when a plot is actually made
+    import matplotlib.pyplot as plt
+    from sklearn.linear_model import LinearRegression
+
+    # Either a raw CSV (file_path) or one race from the columnar store (year + gp)
+    if file_path is None:
+        print(f"Analyzing {year} {gp}...")
+        df = load_laps(years=[year], gps=[gp], columns=WEAR_COLUMNS)
+    else:
+        print(f"Analyzing {file_path}...")
+        df = pd.read_csv(file_path)
 
     # 1. Calculate 'Fuel Corrected LapTime'
     # We ADD time back to simulate what the lap would be if fuel weight stayed constant.
@@ -19,7 +36,7 @@ def analyze_tire_wear(file_path):
     df['FuelCorrectedTime'] = df['LapTimeSec'] + (df['LapNumber'] * FUEL_CORRECTION_PER_LAP)
 
     # 2. Analyze per Compound
-    compounds = df['Compound'].unique()
+    compounds = df['Compound'].dropna().unique()
 
     results = {}
 
@@ -63,7 +80,7 @@ def analyze_tire_wear(file_path):
     plt.title('Tire Degradation Model (Fuel Effect Removed)')
     plt.legend()
     plt.grid(True)
-    plt.savefig('../data/processed/tire_degradation_plot.png')
+    plt.savefig(os.path.join(PROCESSED_DIR, 'tire_degradation_plot.png'))
     plt.show()
 
     return results
@@ -71,6 +88,6 @@ def analyze_tire_wear(file_path):
 
 if __name__ == "__main__":
     # Point this to the file just created
-    coefficients = analyze_tire_wear('../data/processed/2024_Bahrain_Clean.csv')
+    coefficients = analyze_tire_wear(os.path.join(PROCESSED_DIR, '2024_Bahrain_Clean.csv'))
     print("\n--- FINAL MODEL COEFFICIENTS ---")
     print(coefficients)
\ No newline at end of file
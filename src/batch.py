@@ -0,0 +1,152 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.strategy import StrategyOptimizer
+
+# Headless batch runner: no GUI imports, safe on servers.
+#   python -m src.batch jobs.jsonl                       -> JSON lines on stdout
+#   python -m src.batch jobs.csv --format csv -o out.csv -> CSV file
+#   cat jobs.jsonl | python -m src.batch - --workers 8
+# A job is (team, track, rain_prob, stops, samples), optionally total_laps / season / seed.
+# total_laps defaults to the track's race distance; the result reports the laps actually raced.
+# JSON lines, a JSON list or CSV with those column names are accepted.
+
+JOB_DEFAULTS = {'rain_prob': 0, 'stops': 1, 'samples': 0, 'total_laps': None, 'season': None, 'seed': None}
+INT_FIELDS = ('rain_prob', 'stops', 'samples', 'total_laps', 'season', 'seed')
+# StrategyPlanner's search depth; the two-compound rule leaves no 0-stop plan
+MIN_STOPS, MAX_STOPS = 1, 3
+
+RESULT_FIELDS = ['job', 'team', 'track', 'season', 'rain_prob', 'stops', 'total_laps', 'samples',
+                 'expected_min', 'stop_laps', 'tires', 'mean_min', 'std_min', 'p05_min', 'p95_min',
+                 'seconds', 'error']
+
+
+def normalize_job(raw):
+    job = dict(JOB_DEFAULTS)
+    job.update({k: v for k, v in raw.items() if v not in (None, '')})
+    for field in INT_FIELDS:
+        if job[field] is not None:
+            job[field] = int(job[field])
+    if 'team' not in job or 'track' not in job:
+        raise ValueError(f"Job needs a team and a track: {raw}")
+    if not MIN_STOPS <= job['stops'] <= MAX_STOPS:
+        raise ValueError(f"Job stops must be {MIN_STOPS}-{MAX_STOPS}, got {job['stops']}: {raw}")
+    return job
+
+
+def read_jobs(path):
+    # '-' reads from stdin; the format follows the extension (.csv, otherwise JSON / JSON lines)
+    f = sys.stdin if path == '-' else open(path, 'r', newline='')
+    try:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            text = f.read().strip()
+            rows = json.loads(text) if text.startswith('[') else \
+                [json.loads(line) for line in text.splitlines() if line.strip()]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return [normalize_job(row) for row in rows]
+
+
+def run_job(args):
+    # Runs inside a worker process: best `stops`-stop plan, then `samples` Monte Carlo races of it
+    index, job, seed = args
+    start = time.perf_counter()
+    result = {field: job.get(field) for field in RESULT_FIELDS}
+    result['job'] = index
+
+    try:
+        opt = StrategyOptimizer(job['team'], job['track'], job['rain_prob'], job['total_laps'],
+                                seed=seed, season=job['season'])
+        result['total_laps'] = opt.total_laps
+        expected_min, (stop_laps, tires) = opt.find_optimal_k_stop(job['stops'])
+        result.update(expected_min=round(expected_min, 4), stop_laps=list(stop_laps), tires=list(tires))
+
+        if job['samples'] > 0:
+            totals = opt.engine.simulate([(stop_laps, tires)], n_races=job['samples'], seed=seed).total_times / 60.0
+            result.update(mean_min=round(float(totals.mean()), 4), std_min=round(float(totals.std()), 4),
+                          p05_min=round(float(np.percentile(totals, 5)), 4),
+                          p95_min=round(float(np.percentile(totals, 95)), 4))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def run_jobs(jobs, workers=None, seed=None, executor=None):
+    # Yields results in job order as soon as each is ready
+    seeds = [job['seed'] if job['seed'] is not None else seed for job in jobs]
+    tasks = [(i, job, s) for i, (job, s) in enumerate(zip(jobs, seeds))]
+
+    workers = workers or os.cpu_count() or 1
+    if executor is None and workers == 1:
+        yield from map(run_job, tasks)
+        return
+
+    own_pool = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from executor.map(run_job, tasks)
+    finally:
+        if own_pool:
+            executor.shutdown()
+
+
+class ResultWriter:
+    # Streams results as JSON lines or CSV, flushing after every row
+    def __init__(self, out, fmt='jsonl'):
+        self.out = out
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, result):
+        if self.fmt == 'csv':
+            row = dict(result)
+            for field in ('stop_laps', 'tires'):
+                if row[field] is not None:
+                    row[field] = ';'.join(str(v) for v in row[field])
+            self.writer.writerow(row)
+        else:
+            self.out.write(json.dumps(result) + '\n')
+        self.out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run strategy optimisation jobs without the GUI.")
+    parser.add_argument('jobs', help="Job file (.jsonl / .json / .csv), '-' for stdin")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('-o', '--output', help="Write results here instead of stdout")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for jobs without their own")
+    args = parser.parse_args(argv)
+
+    jobs = read_jobs(args.jobs)
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    failed = 0
+    try:
+        writer = ResultWriter(out, args.format)
+        for result in run_jobs(jobs, args.workers, args.seed):
+            writer.write(result)
+            failed += result['error'] is not None
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head): silence the flush at interpreter exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
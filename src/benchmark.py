@@ -0,0 +1,313 @@
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from src.params import PROJECT_ROOT, PARAMS
+from src.simulation import RaceCar
+from src.strategy import StrategyOptimizer
+from src.monte_carlo import compare_strategies
+from src.grid import GridRaceEngine
+from src.live import LiveStrategist, RaceState
+
+# Headless benchmark harness for the simulation / optimizer hot paths.
+#   python -m src.benchmark                      -> run the default matrix, print a summary
+#   python -m src.benchmark -o results.json      -> also write machine-readable results
+#   python -m src.benchmark --save-baseline      -> store the run as the new baseline
+#   python -m src.benchmark --compare            -> fail (exit 1) on regressions vs the baseline
+# The baseline in git holds only the physics fingerprints, so it changes only when the model does.
+# Timings are machine-specific and go to an untracked file next to it.
+
+BASELINE_PATH = os.path.join(PROJECT_ROOT, 'data', 'benchmarks', 'baseline.json')
+SEASON_DIR = os.path.join(PROJECT_ROOT, 'data', 'season_2023')
+
+DEFAULT_TEAMS = ['Red Bull Racing', 'Ferrari', 'Williams']
+DEFAULT_TRACKS = ['Bahrain', 'Monaco', 'Austria']
+DEFAULT_RAIN = [0, 30]
+
+SEED = 2023
+REFERENCE_1_STOP = (20, ['SOFT', 'HARD'])
+REFERENCE_2_STOP = ([18, 38], ['SOFT', 'MEDIUM', 'SOFT'])
+
+# Cold-import cost of the entry points worker processes and CLIs start from.
+# Each import runs in a fresh interpreter; the result counts heavy modules pulled in.
+IMPORT_TARGETS = ['src.simulation', 'src.strategy', 'src.monte_carlo', 'src.batch']
+HEAVY_MODULES = ['pandas', 'sklearn', 'fastf1', 'matplotlib', 'PIL', 'customtkinter', 'pyarrow']
+
+
+def timed(fn, repeat):
+    # Best of `repeat` runs; returns (seconds, last result)
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_simulate_lap(team, track, rain, laps=57, races=20):
+    def run():
+        for i in range(races):
+            car = RaceCar(team, track, rain, seed=SEED, stream=i, record_history=False)
+            for _ in range(laps):
+                car.simulate_lap()
+        return None
+    return run, laps * races
+
+
+def bench_evaluate_strategy(team, track, rain, races=20):
+    opt = StrategyOptimizer(team, track, rain, seed=SEED)
+
+    def run():
+        return [opt.evaluate_strategy([REFERENCE_1_STOP[0]], REFERENCE_1_STOP[1]) for _ in range(races)][-1]
+    return run, races
+
+
+def bench_find_optimal(team, track, rain, stops, search):
+    def run():
+        opt = StrategyOptimizer(team, track, rain, seed=SEED, search=search)
+        return opt.find_optimal_1_stop() if stops == 1 else opt.find_optimal_2_stop()
+    return run, 1
+
+
+def bench_monte_carlo(team, track, rain, n=500):
+    def run():
+        mc = compare_strategies(team, track, rain, REFERENCE_1_STOP, REFERENCE_2_STOP,
+                                min_samples=n, max_samples=n, tolerance=0.0, seed=SEED)
+        return {'n': mc.n, 'win_prob_a': mc.win_prob_a, 'mean_delta': mc.mean_delta}
+    return run, n
+
+
+def bench_grid_race(track, rain, n=200):
+    # Whole field on the reference 1-stop, so only pace, traffic and the dice separate the cars
+    entries = [(f"{team} #{i}", team, REFERENCE_1_STOP) for team in PARAMS.team_db() for i in (1, 2)]
+    engine = GridRaceEngine(track, entries, rain)
+
+    def run():
+        result = engine.simulate(n, seed=SEED)
+        return {'mean_position_0': result.mean_position()[0], 'mean_gap_sum': result.gap_to_leader().mean(0).sum()}
+    return run, n
+
+
+def bench_live_recommend(team, track, rain):
+    # One pit-wall call per lap of a race on the reference 1-stop: per_call is the call latency
+    strategist = LiveStrategist(team, track, rain)
+    laps = strategist.total_laps
+    stop, tires = REFERENCE_1_STOP
+
+    def run():
+        box_calls = 0
+        for lap in range(laps):
+            compound, age = (tires[0], lap) if lap < stop - 1 else (tires[1], lap - stop + 1)
+            fuel = strategist.start_fuel - lap * strategist.car.base_burn_rate
+            call = strategist.recommend(RaceState(lap, compound, age, fuel, False, False, tuple(tires[:1]),
+                                                  int(lap >= stop - 1)))
+            box_calls += call.box
+        return {'box_calls': box_calls, 'last_remaining': call.expected_remaining}
+    return run, laps
+
+
+def bench_profile_season(store_dir, warm=False):
+    # store_dir=None forces the raw CSV path.
+    # warm=True times a re-run against an up-to-date manifest (nothing to re-profile).
+    from src.profiler import profile_season
+    warm_dir = tempfile.mkdtemp() if warm else None
+    if warm:
+        atexit.register(shutil.rmtree, warm_dir, ignore_errors=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            profile_season(data_dir=SEASON_DIR, out_dir=warm_dir, store_dir=store_dir)
+
+    def run():
+        with contextlib.ExitStack() as stack:
+            out_dir = warm_dir or stack.enter_context(tempfile.TemporaryDirectory())
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            track_db, team_db = profile_season(data_dir=SEASON_DIR, out_dir=out_dir, store_dir=store_dir)
+        return {'tracks': len(track_db), 'teams': len(team_db),
+                'avg_deg_sum': sum(t['avg_deg'] for t in track_db.values()),
+                'pace_index_sum': sum(t['pace_index'] for t in team_db.values())}
+    return run, 1
+
+
+def bench_import(module):
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; "
+            f"elapsed = time.perf_counter() - start; "
+            f"print(elapsed, sum(m in sys.modules for m in {HEAVY_MODULES!r}))")
+
+    def run():
+        out = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True,
+                             text=True, check=True).stdout.split()
+        return {'import_seconds': float(out[0]), 'heavy_modules': int(out[1])}
+    return run, 1
+
+
+def fingerprint(result):
+    # Physics output recorded next to the timing, so model changes show up in --compare
+    if result is None:
+        return None
+    if isinstance(result, tuple):
+        time_min, strategy = result
+        stops, tires = strategy
+        return {'time_min': round(float(time_min), 6), 'stops': np.atleast_1d(stops).tolist(), 'tires': list(tires)}
+    if isinstance(result, dict):
+        return {k: round(float(v), 6) for k, v in result.items()}
+    return round(float(result), 6)
+
+
+def run_matrix(teams, tracks, rains, repeat=3, include_profiler=True, log=print):
+    results = []
+
+    def record(name, fn, calls, team=None, track=None, rain=None, seconds_key=None):
+        if seconds_key is None:
+            seconds, result = timed(fn, repeat)
+        else:
+            # Best of the times measured inside the callee (e.g. excluding interpreter startup)
+            runs = [fn() for _ in range(repeat)]
+            seconds = min(r.pop(seconds_key) for r in runs)
+            result = runs[-1]
+        results.append({
+            'name': name, 'team': team, 'track': track, 'rain': rain,
+            'seconds': seconds, 'calls': calls, 'per_call': seconds / calls,
+            'result': fingerprint(result)
+        })
+        log(f"{name:<28} {str(team):<16} {str(track):<10} {str(rain):<4} {seconds * 1000:9.2f} ms")
+
+    for module in IMPORT_TARGETS:
+        record(f'import[{module}]', *bench_import(module), seconds_key='import_seconds')
+
+    for team in teams:
+        for track in tracks:
+            for rain in rains:
+                record('simulate_lap', *bench_simulate_lap(team, track, rain), team, track, rain)
+                record('evaluate_strategy', *bench_evaluate_strategy(team, track, rain), team, track, rain)
+                for search in ('dp', 'grid'):
+                    record(f'find_optimal_1_stop[{search}]', *bench_find_optimal(team, track, rain, 1, search),
+                           team, track, rain)
+                    record(f'find_optimal_2_stop[{search}]', *bench_find_optimal(team, track, rain, 2, search),
+                           team, track, rain)
+                record('monte_carlo_500', *bench_monte_carlo(team, track, rain), team, track, rain)
+                record('live_recommend', *bench_live_recommend(team, track, rain), team, track, rain)
+
+    for track in tracks:
+        for rain in rains:
+            record('grid_race_200', *bench_grid_race(track, rain), None, track, rain)
+
+    if include_profiler:
+        from src.lap_store import STORE_DIR, has_season
+        record('profile_season[csv]', *bench_profile_season(None))
+        if has_season(2023, STORE_DIR):
+            record('profile_season[store]', *bench_profile_season(STORE_DIR))
+            record('profile_season[incremental]', *bench_profile_season(STORE_DIR, warm=True))
+
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def result_key(r):
+    return r['name'], r['team'], r['track'], r['rain']
+
+
+def timings_path(baseline_path):
+    root, ext = os.path.splitext(baseline_path)
+    return f"{root}.timings.local{ext}"
+
+
+def fingerprints(results):
+    return {'results': [{k: r[k] for k in ('name', 'team', 'track', 'rain', 'result')} for r in results]}
+
+
+def save_baseline(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(fingerprints(report['results']), f, indent=2)
+        f.write('\n')
+    with open(timings_path(path), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_baseline(path):
+    # Fingerprints from git, merged with this machine's timings if it saved any
+    with open(path, 'r') as f:
+        baseline = json.load(f)
+    timings = {}
+    if os.path.exists(timings_path(path)):
+        with open(timings_path(path), 'r') as f:
+            timings = {result_key(r): r['seconds'] for r in json.load(f)['results']}
+    for r in baseline['results']:
+        r['seconds'] = timings.get(result_key(r))
+    return baseline
+
+
+def compare(results, baseline, max_slowdown=2.0, log=print):
+    # Flags timings slower than max_slowdown x baseline and any change in physics output.
+    # Timings are only compared when this machine has saved its own (seconds is None otherwise).
+    base = {result_key(r): r for r in baseline['results']}
+    problems = []
+
+    for r in results:
+        old = base.get(result_key(r))
+        if old is None:
+            continue
+        if old.get('seconds'):
+            ratio = r['seconds'] / old['seconds']
+            if ratio > max_slowdown:
+                problems.append(f"SLOWER x{ratio:.2f}: {result_key(r)}")
+        if r['result'] != old['result']:
+            problems.append(f"RESULT CHANGED: {result_key(r)} {old['result']} -> {r['result']}")
+
+    for p in problems:
+        log(p)
+    log(f"--- {len(problems)} regression(s) vs baseline ---")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the F1 strategy simulation hot paths.")
+    parser.add_argument('--teams', nargs='+', default=DEFAULT_TEAMS)
+    parser.add_argument('--tracks', nargs='+', default=DEFAULT_TRACKS)
+    parser.add_argument('--rain', nargs='+', type=int, default=DEFAULT_RAIN)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-profiler', action='store_true', help="Skip the profile_season pipeline")
+    parser.add_argument('-o', '--output', help="Write JSON results to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--max-slowdown', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    results = run_matrix(args.teams, args.tracks, args.rain, args.repeat, not args.no_profiler)
+    report = {'environment': environment(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"[SUCCESS] Baseline saved to {args.baseline} (timings: {timings_path(args.baseline)})")
+
+    if args.compare:
+        baseline = load_baseline(args.baseline)
+        if compare(results, baseline, args.max_slowdown):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
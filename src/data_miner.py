@@ -1,4 +1,11 @@
+import argparse
+import json
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from src.params import DATA_DIR
 from src.utils import get_race_data
 
 # We will grab the 2023 season because it's a complete dataset with consistent car performance.
@@ -9,28 +16,198 @@ RACES_2023 = [
     'Japan', 'Qatar', 'United States', 'Mexico', 'Brazil', 'Las Vegas', 'Abu Dhabi'
 ]
 
+RACES_2024 = [
+    'Bahrain', 'Saudi Arabia', 'Australia', 'Japan', 'China', 'Miami',
+    'Emilia Romagna', 'Monaco', 'Canada', 'Spain', 'Austria', 'Great Britain',
+    'Hungary', 'Belgium', 'Netherlands', 'Italy', 'Azerbaijan', 'Singapore',
+    'United States', 'Mexico', 'Brazil', 'Las Vegas', 'Qatar', 'Abu Dhabi'
+]
+
+RACES_2025 = [
+    'Australia', 'China', 'Japan', 'Bahrain', 'Saudi Arabia', 'Miami',
+    'Emilia Romagna', 'Monaco', 'Spain', 'Canada', 'Austria', 'Great Britain',
+    'Belgium', 'Hungary', 'Netherlands', 'Italy', 'Azerbaijan', 'Singapore',
+    'United States', 'Mexico', 'Brazil', 'Las Vegas', 'Qatar', 'Abu Dhabi'
+]
+
+CALENDARS = {2023: RACES_2023, 2024: RACES_2024, 2025: RACES_2025}
+
+# fastf1 session identifiers: Race, Qualifying, Sprint, Free Practice 1-3
+SESSION_TYPES = ['R', 'Q', 'S', 'FP1', 'FP2', 'FP3']
+
+# Progress of every (year, session, gp) job, so an interrupted pull resumes where it stopped
+MANIFEST_PATH = os.path.join(DATA_DIR, 'mining_manifest.json')
+DEFAULT_WORKERS = 4
+
+
+def season_dir(year, session_type='R', data_dir=DATA_DIR):
+    # Races keep the original data/season_<year> layout, other sessions get their own folder
+    suffix = '' if session_type == 'R' else f'_{session_type}'
+    return os.path.join(data_dir, f'season_{year}{suffix}')
+
+
+def job_key(year, session_type, gp):
+    return f'{year}/{session_type}/{gp}'
+
+
+# --- LOADERS ---
+class CsvSession:
+    # Offline stand-in for a fastf1 session: replays a previously mined CSV
+    def __init__(self, path):
+        self.path = path
+        self.laps = None
+
+    def load(self):
+        laps = pd.read_csv(self.path)
+        laps['LapTime'] = pd.to_timedelta(laps['LapTime'])
+        self.laps = laps.drop(columns=['LapTimeSec'], errors='ignore')
+
+
+class CsvLoader:
+    # Loader over a directory tree laid out like data/ (season_<year>[_<session>]/<gp>_Clean.csv)
+    def __init__(self, source_dir=DATA_DIR):
+        self.source_dir = source_dir
+
+    def __call__(self, year, gp, session_type='R'):
+        path = os.path.join(season_dir(year, session_type, self.source_dir), f'{gp}_Clean.csv')
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return CsvSession(path)
+
+
+# --- MANIFEST ---
+def read_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {'jobs': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
 
-def mine_season_data(year=2023):
-    print(f"--- STARTING DATA MINING FOR {year} ---")
-    save_dir = f'../data/season_{year}'
-    os.makedirs(save_dir, exist_ok=True)
 
-    for gp in RACES_2023:
-        file_path = f'{save_dir}/{gp}_Clean.csv'
+def is_complete(entry, file_path):
+    return entry is not None and entry.get('status') == 'done' and os.path.exists(file_path)
 
-        if os.path.exists(file_path):
-            print(f"[SKIP] {gp} already exists.")
+
+def adopt_existing(file_path):
+    # CSVs written before the manifest existed: keep them only if they parse and have laps
+    try:
+        return len(pd.read_csv(file_path, usecols=['LapNumber']))
+    except Exception:
+        return 0
+
+
+# --- WORKER ---
+def download_race(year, session_type, gp, file_path, loader=None):
+    # Runs in the pool. Writes to a temp file and renames, so a crash never leaves a
+    # half-written CSV under the final name.
+    start = time.perf_counter()
+    df = get_race_data(year, gp, session_type, loader=loader)
+    if df.empty:
+        return {'status': 'empty', 'rows': 0, 'seconds': time.perf_counter() - start}
+
+    tmp_path = file_path + '.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, file_path)
+    return {'status': 'done', 'rows': len(df), 'seconds': time.perf_counter() - start}
+
+
+def plan_jobs(years, session_types=('R',), races=None, data_dir=DATA_DIR):
+    # [(year, session_type, gp, file_path)] for every requested combination
+    jobs = []
+    for year in years:
+        calendar = races or CALENDARS.get(year)
+        if calendar is None:
+            raise ValueError(f"No race calendar for {year}, pass races explicitly")
+        for session_type in session_types:
+            for gp in calendar:
+                file_path = os.path.join(season_dir(year, session_type, data_dir), f'{gp}_Clean.csv')
+                jobs.append((year, session_type, gp, file_path))
+    return jobs
+
+
+def mine(jobs, workers=DEFAULT_WORKERS, loader=None, executor=None, manifest_path=MANIFEST_PATH, force=False):
+    # Downloads the pending jobs on a bounded pool and records each result in the manifest
+    # as soon as it lands. Returns the manifest entries of this run's jobs.
+    manifest = read_manifest(manifest_path)
+    entries = manifest['jobs']
+    pending = []
+
+    for year, session_type, gp, file_path in jobs:
+        key = job_key(year, session_type, gp)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if os.path.exists(file_path + '.tmp'):
+            os.remove(file_path + '.tmp')  # leftover from an interrupted write
+
+        if not force and key not in entries and os.path.exists(file_path):
+            rows = adopt_existing(file_path)
+            if rows:
+                entries[key] = {'status': 'done', 'rows': rows, 'path': file_path, 'adopted': True}
+
+        if not force and is_complete(entries.get(key), file_path):
+            print(f"[SKIP] {key} already exists.")
             continue
+        pending.append((year, session_type, gp, file_path))
+
+    write_manifest(manifest, manifest_path)
+    print(f"--- {len(jobs) - len(pending)} cached, {len(pending)} to download ({workers} workers) ---")
+
+    own_pool = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(download_race, year, session_type, gp, file_path, loader):
+                   (job_key(year, session_type, gp), file_path)
+                   for year, session_type, gp, file_path in pending}
+
+        for future in as_completed(futures):
+            key, file_path = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {'status': 'failed', 'rows': 0, 'error': str(e)}
+            entry['path'] = file_path
+            entries[key] = entry
+            write_manifest(manifest, manifest_path)
+
+            if entry['status'] == 'done':
+                print(f"[SUCCESS] Saved {entry['rows']} laps for {key}")
+            elif entry['status'] == 'empty':
+                print(f"[WARNING] No data found for {key}")
+            else:
+                print(f"[FAILED] {key}: {entry['error']}")
+    finally:
+        if own_pool:
+            executor.shutdown()
+
+    return {job_key(y, s, gp): entries.get(job_key(y, s, gp)) for y, s, gp, _ in jobs}
+
+
+def mine_season_data(year=2023, session_types=('R',), races=None, workers=DEFAULT_WORKERS, loader=None,
+                     data_dir=DATA_DIR, manifest_path=MANIFEST_PATH, force=False):
+    print(f"--- STARTING DATA MINING FOR {year} ---")
+    return mine(plan_jobs([year], session_types, races, data_dir), workers, loader,
+                manifest_path=manifest_path, force=force)
+
 
-        print(f"[DOWNLOADING] {gp}...")
-        df = get_race_data(year, gp)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download lap data for one or more seasons.")
+    parser.add_argument('--years', nargs='+', type=int, default=[2023])
+    parser.add_argument('--sessions', nargs='+', default=['R'], choices=SESSION_TYPES)
+    parser.add_argument('--races', nargs='+', help="Override the season calendar")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--force', action='store_true', help="Re-download completed jobs")
+    parser.add_argument('--offline', metavar='DIR', help="Replay CSVs from DIR instead of fastf1")
+    args = parser.parse_args(argv)
 
-        if not df.empty:
-            df.to_csv(file_path, index=False)
-            print(f"[SUCCESS] Saved {len(df)} laps for {gp}")
-        else:
-            print(f"[WARNING] No data found for {gp}")
+    loader = CsvLoader(args.offline) if args.offline else None
+    results = mine(plan_jobs(args.years, args.sessions, args.races), args.workers, loader, force=args.force)
+    return 0 if all(e and e['status'] == 'done' for e in results.values()) else 1
 
 
 if __name__ == "__main__":
-    mine_season_data(2023)
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import numpy as np
+from src.simulation import RaceCar, make_rng, safety_car_chance
+from src.params import COMPOUNDS, COMPOUND_CODE, TYRE_AGE_LIMIT, race_laps
+from src.history import LapHistory, pit_reason_code
+
+SOFT, MEDIUM, HARD, INTER = range(4)
+
+# Seconds lost in the pit lane (under a Safety Car the field is slow, so a stop costs less)
+PIT_LOSS = 22.0
+SC_PIT_LOSS = 12.0
+
+
+def normalize_strategy(strategy):
+    # Accepts both (lap, combo) from find_optimal_1_stop and ([l1, l2], combo)
+    stops, tires = strategy
+    if not isinstance(stops, (list, tuple)):
+        stops = [stops]
+    return [int(s) for s in stops], list(tires)
+
+
+class BatchResult:
+    def __init__(self, lap_times, compound, tyre_age, rain, sc, fuel, health, pit, n_races):
+        self.lap_times = lap_times  # (N, laps) seconds, pit loss included
+        self.compound = compound  # (N, laps) compound codes
+        self.tyre_age = tyre_age
+        self.rain = rain
+        self.sc = sc
+        self.fuel = fuel
+        self.health = health
+        self.pit = pit  # pit[i, lap]: boxed at the start of this lap
+        self.pit_before = np.zeros_like(pit)  # same stop, flagged on the lap carrying the pit loss
+        self.pit_before[:, :-1] = pit[:, 1:]
+        self.pit_before[:, 0] |= pit[:, 0]
+        self.n_races = n_races
+        self.total_times = lap_times.sum(axis=1)
+
+    def history(self, row):
+        # LapHistory of one simulated race, for the GUI graph / telemetry consumers
+        return LapHistory.from_columns(
+            Lap=np.arange(1, self.lap_times.shape[1] + 1), Time=self.lap_times[row],
+            Compound=self.compound[row], TyreAge=self.tyre_age[row], Rain=self.rain[row],
+            SC=self.sc[row], Fuel=self.fuel[row], Health=self.health[row], PitStop=self.pit_before[row],
+            PitReason=np.where(self.pit_before[row], pit_reason_code("Scheduled"), 0)
+        )
+
+    def totals_by_strategy(self):
+        # (n_strategies, n_races) total race time in seconds
+        return self.total_times.reshape(-1, self.n_races)
+
+
+class BatchRaceEngine:
+    def __init__(self, team_name, track_name, rain_prob=0, total_laps=None, season=None):
+        self.team_name = team_name
+        self.track_name = track_name
+        self.season = season
+        self.rain_prob = rain_prob
+        self.total_laps = race_laps(track_name, season, total_laps)
+
+        # Borrow the physics constants from a scalar car so both paths always agree
+        proto = RaceCar(team_name, track_name, rain_prob, season=season)
+        self.base_lap_time = proto.base_lap_time
+        self.start_fuel = proto.current_fuel
+        self.fuel_penalty = proto.fuel_penalty
+        self.base_burn_rate = proto.base_burn_rate
+        self.variance = 0.1 * proto.team_stats['pace_index']
+        self.sc_chance = safety_car_chance(track_name)
+
+        self.deg_coeffs = np.array([proto.tire_deg_coeffs[c] for c in COMPOUNDS])
+        self.cliff_table = proto.cliff_table
+        self.pace_offsets = np.array([proto.tire_pace_offsets[c] for c in COMPOUNDS])
+
+    def build_schedule(self, strategies):
+        # Turns (stops, tires) pairs into per-lap compound codes and pit flags
+        n = len(strategies)
+        compound = np.zeros((n, self.total_laps), dtype=np.int8)
+        pit = np.zeros((n, self.total_laps), dtype=bool)
+
+        for i, strategy in enumerate(strategies):
+            stops, tires = normalize_strategy(strategy)
+            t_idx = 0
+            current = COMPOUND_CODE[tires[0]]
+            for lap in range(1, self.total_laps + 1):
+                if lap in stops:
+                    t_idx += 1
+                    if t_idx < len(tires):
+                        current = COMPOUND_CODE[tires[t_idx]]
+                        pit[i, lap - 1] = True
+                compound[i, lap - 1] = current
+
+        return compound, pit
+
+    def draw_randomness(self, rng, n_rows, laps):
+        # One uniform per (row, lap) for weather, SC and lap variance
+        weather = rng.uniform(0, 100, (n_rows, laps)) if self.rain_prob != 0 else None
+        sc = rng.uniform(0, 100, (n_rows, laps))
+        variance = rng.uniform(-self.variance, self.variance, (n_rows, laps))
+        return weather, sc, variance
+
+    def lap_step(self, tire, tyre_age, fuel, raining, is_sc, lap_variance):
+        # One lap for every row, pit loss excluded: (lap time, fuel left, tyre health %).
+        # Works on any shape as long as the arguments broadcast (src/grid.py passes (races, cars)).
+        is_soft = tire == SOFT
+        is_inter = tire == INTER
+
+        # --- BASE PACE ---
+        t = self.base_lap_time + fuel * self.fuel_penalty + self.pace_offsets[tire]
+        t += np.where(raining, np.where(is_inter, 10.0, 30.0), np.where(is_inter, 5.0, 0.0))
+        t += np.where(is_sc, 40.0, 0.0)
+
+        # --- DEGRADATION & CLIFF ---
+        deg_factor = np.where(is_sc, 0.2, 1.0)
+        t += tyre_age * self.deg_coeffs[tire] * deg_factor
+
+        cliff_age = np.where(is_soft, 25.0, 40.0)
+        health = np.maximum(0, 100 - (tyre_age / cliff_age) * 100)
+
+        cliff = self.cliff_table[tire, np.minimum(tyre_age, TYRE_AGE_LIMIT)]
+        t += np.where(is_sc, 0.0, cliff)
+
+        # --- RANDOMNESS ---
+        t += lap_variance
+
+        # --- DYNAMIC FUEL ---
+        burn_factor = np.where(is_soft, 1.05, np.where(tire == HARD, 0.95, 1.0))
+        burn_factor = np.where(raining, 0.85, burn_factor)
+        burn_factor = np.where(is_sc, 0.4, burn_factor)
+        fuel = fuel - (self.base_burn_rate * burn_factor - lap_variance * 0.5)
+        return t, fuel, health
+
+    def simulate(self, strategies, n_races=1, seed=None, rng=None, common_random_numbers=False):
+        # strategies: list of (stops, tires). Each one is raced n_races times.
+        # Rows are strategy-major: row = strategy_idx * n_races + race_idx
+        # common_random_numbers: race r of every strategy sees the same rain, SC and
+        # lap variance draws, so strategies are compared on identical races.
+        if rng is None:
+            rng = make_rng(seed)
+
+        compound, pit = self.build_schedule(strategies)
+        if n_races > 1:
+            compound = np.repeat(compound, n_races, axis=0)
+            pit = np.repeat(pit, n_races, axis=0)
+
+        n, laps = compound.shape
+        lap_times = np.zeros((n, laps))
+        tyre_age_hist = np.zeros((n, laps), dtype=np.int16)
+        rain_hist = np.zeros((n, laps), dtype=bool)
+        sc_hist = np.zeros((n, laps), dtype=bool)
+        fuel_hist = np.zeros((n, laps))
+        health_hist = np.zeros((n, laps), dtype=np.int8)
+
+        fuel = np.full(n, self.start_fuel)
+        tyre_age = np.zeros(n, dtype=np.int64)
+        raining = np.zeros(n, dtype=bool)
+        prev_sc = np.zeros(n, dtype=bool)
+        rain_chance = self.rain_prob / 10.0
+
+        if common_random_numbers:
+            weather_rolls, sc_rolls, variance_draws = self.draw_randomness(rng, n_races, laps)
+            rows = np.tile(np.arange(n_races), len(strategies))
+            if weather_rolls is not None:
+                weather_rolls = weather_rolls[rows]
+            sc_rolls, variance_draws = sc_rolls[rows], variance_draws[rows]
+        else:
+            weather_rolls, sc_rolls, variance_draws = self.draw_randomness(rng, n, laps)
+
+        for lap in range(laps):
+            tire = compound[:, lap]
+
+            # --- PIT STOPS (loss is booked on the previous lap, like RaceCar.pit_stop) ---
+            boxing = pit[:, lap]
+            if boxing.any():
+                pit_loss = np.where(prev_sc, SC_PIT_LOSS, PIT_LOSS)
+                lap_times[boxing, max(lap - 1, 0)] += pit_loss[boxing]
+                tyre_age[boxing] = 0
+
+            # --- WEATHER & SC ---
+            if weather_rolls is not None:
+                roll = weather_rolls[:, lap]
+                raining = np.where(raining, roll >= 5, roll < rain_chance)
+            is_sc = sc_rolls[:, lap] < self.sc_chance
+
+            t, fuel, health = self.lap_step(tire, tyre_age, fuel, raining, is_sc, variance_draws[:, lap])
+
+            tyre_age += 1
+            prev_sc = is_sc
+
+            lap_times[:, lap] += t
+            tyre_age_hist[:, lap] = tyre_age
+            rain_hist[:, lap] = raining
+            sc_hist[:, lap] = is_sc
+            fuel_hist[:, lap] = fuel
+            health_hist[:, lap] = health.astype(np.int8)
+
+        return BatchResult(lap_times, compound, tyre_age_hist, rain_hist, sc_hist, fuel_hist,
+                           health_hist, pit, n_races)
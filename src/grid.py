@@ -0,0 +1,246 @@
+import argparse
+import sys
+from collections import namedtuple
+import numpy as np
+from src.simulation import make_rng, safety_car_chance
+from src.engine import BatchRaceEngine, SC_PIT_LOSS, PIT_LOSS
+from src.params import PARAMS, race_laps
+
+# Full-grid race: every car on one timeline, so track position matters.
+#   python -m src.grid --track Bahrain --races 1000
+# Vectorised like BatchRaceEngine, with arrays shaped (races, cars). Each lap is one event per
+# car (crossing the line); the event queue is the field sorted by cumulative time, re-sorted
+# every lap. Lap physics comes from each team's BatchRaceEngine.lap_step; on top of it:
+#   - dirty air: a car starting the lap within DIRTY_AIR_GAP of the car ahead loses up to DIRTY_AIR_LOSS
+#   - overtaking: a car that would cross the line ahead of the car in front gets past with
+#     probability 1 - exp(-advantage / pass_scale), otherwise it is held MIN_GAP behind.
+#     At most one place is gained on track per lap.
+#   - pit stops: the in-lap carries the pit loss and takes no part in traffic; the car rejoins
+#     wherever its cumulative time puts it
+#   - Safety Car: no overtaking, gaps to the car ahead shrink by SC_CLOSE per lap
+
+GridEntry = namedtuple('GridEntry', ['name', 'team', 'strategy'])
+
+GRID_SPACING = 0.3  # s between grid slots at the start
+DIRTY_AIR_GAP = 1.0
+DIRTY_AIR_LOSS = 0.5
+MIN_GAP = 0.2
+SC_CLOSE = 0.5
+SC_GAP = 0.4
+
+# Advantage (s) for a 63% chance to pass. Tracks not listed use PASS_SCALE
+PASS_SCALE = 0.8
+HARD_TO_PASS = {"Monaco": 4.0, "Singapore": 2.0, "Hungary": 1.6, "Spain": 1.4, "Japan": 1.2}
+
+
+def pass_scale(track_name):
+    return HARD_TO_PASS.get(track_name, PASS_SCALE)
+
+
+class GridResult:
+    def __init__(self, entries, lap_times, positions, pit, rain, sc, n_races):
+        self.entries = entries
+        self.lap_times = lap_times  # (races, cars, laps), pit loss included
+        self.positions = positions  # (races, cars, laps) 1 = leading at the end of the lap
+        self.pit = pit  # (cars, laps) True on the in-lap
+        self.rain = rain  # (races, laps)
+        self.sc = sc
+        self.n_races = n_races
+        self.total_times = lap_times.sum(axis=2)
+        self.finish = positions[:, :, -1]
+
+    def names(self):
+        return [e.name for e in self.entries]
+
+    def mean_position(self):
+        return self.finish.mean(axis=0)
+
+    def position_probabilities(self):
+        # (cars, positions): share of races car i finished in position j + 1
+        n_cars = len(self.entries)
+        counts = np.zeros((n_cars, n_cars))
+        for car in range(n_cars):
+            counts[car] = np.bincount(self.finish[:, car] - 1, minlength=n_cars)
+        return counts / self.n_races
+
+    def win_probability(self):
+        return self.position_probabilities()[:, 0]
+
+    def gap_to_leader(self):
+        return self.total_times - self.total_times.min(axis=1, keepdims=True)
+
+    def summary(self):
+        # One row per car, ordered by mean finishing position
+        probs = self.position_probabilities()
+        rows = [{'name': e.name, 'team': e.team, 'mean_position': float(self.finish[:, i].mean()),
+                 'win': float(probs[i, 0]), 'podium': float(probs[i, :3].sum()),
+                 'mean_gap': float(self.gap_to_leader()[:, i].mean())}
+                for i, e in enumerate(self.entries)]
+        return sorted(rows, key=lambda r: r['mean_position'])
+
+
+class GridRaceEngine:
+    def __init__(self, track_name, entries, rain_prob=0, total_laps=None, season=None):
+        # entries: GridEntry / (name, team, strategy) tuples in starting-grid order
+        self.track_name = track_name
+        self.season = season
+        self.rain_prob = rain_prob
+        self.total_laps = race_laps(track_name, season, total_laps)
+        self.entries = [GridEntry(*e) for e in entries]
+        self.sc_chance = safety_car_chance(track_name)
+        self.pass_scale = pass_scale(track_name)
+
+        # One engine per team: physics constants and schedules come from BatchRaceEngine
+        self.engines = {}
+        for e in self.entries:
+            if e.team not in self.engines:
+                self.engines[e.team] = BatchRaceEngine(e.team, track_name, rain_prob, self.total_laps, season)
+        self.team_cols = {team: np.array([i for i, e in enumerate(self.entries) if e.team == team])
+                          for team in self.engines}
+
+        self.compound = np.zeros((len(self.entries), self.total_laps), dtype=np.int8)
+        boxing = np.zeros((len(self.entries), self.total_laps), dtype=bool)
+        for team, cols in self.team_cols.items():
+            strategies = [self.entries[i].strategy for i in cols]
+            self.compound[cols], boxing[cols] = self.engines[team].build_schedule(strategies)
+        self.boxing = boxing  # boxed at the start of this lap
+        self.in_lap = np.zeros_like(boxing)  # lap ending in the pit lane
+        self.in_lap[:, :-1] = boxing[:, 1:]
+        self.in_lap[:, 0] |= boxing[:, 0]
+
+        self.start_fuel = np.array([self.engines[e.team].start_fuel for e in self.entries])
+        self.variance = np.array([self.engines[e.team].variance for e in self.entries])
+
+    def draw_randomness(self, rng, n_races):
+        # Weather and SC are shared by the field, pace noise and pass rolls are per car
+        n_cars, laps = self.compound.shape
+        weather_rolls = rng.uniform(0, 100, (n_races, laps)) if self.rain_prob != 0 else None
+        sc_rolls = rng.uniform(0, 100, (n_races, laps))
+        variance_draws = rng.uniform(-1, 1, (n_races, n_cars, laps)) * self.variance[None, :, None]
+        pass_rolls = rng.uniform(0, 1, (n_races, n_cars, laps))
+        return weather_rolls, sc_rolls, variance_draws, pass_rolls
+
+    def simulate(self, n_races=1, seed=None, rng=None):
+        if rng is None:
+            rng = make_rng(seed)
+        draws = self.draw_randomness(rng, n_races)
+        lap_times, positions, rain_hist, sc_hist = self.race(self.compound[None], self.boxing[None], draws)
+        return GridResult(self.entries, lap_times, positions, self.in_lap, rain_hist, sc_hist, n_races)
+
+    def race(self, compound, boxing, draws):
+        # compound / boxing: (1 or rows, cars, laps) schedules, one per row when the cars' strategies
+        # differ from race to race (src/undercut.py). draws: draw_randomness() output, one row per race.
+        weather_rolls, sc_rolls, variance_draws, pass_rolls = draws
+        n_races, laps = sc_rolls.shape
+        n_cars = compound.shape[1]
+        rows = np.arange(n_races)[:, None]
+        places = np.broadcast_to(np.arange(1, n_cars + 1, dtype=np.int16), (n_races, n_cars))
+        in_lap = np.zeros_like(boxing)
+        in_lap[..., :-1] = boxing[..., 1:]
+        in_lap[..., 0] |= boxing[..., 0]
+
+        lap_times = np.zeros((n_races, n_cars, laps))
+        positions = np.zeros((n_races, n_cars, laps), dtype=np.int16)
+        rain_hist = np.zeros((n_races, laps), dtype=bool)
+        sc_hist = np.zeros((n_races, laps), dtype=bool)
+
+        clock = np.tile(np.arange(n_cars) * GRID_SPACING, (n_races, 1))  # time at the start of the lap
+        fuel = np.tile(self.start_fuel, (n_races, 1))
+        tyre_age = np.zeros((n_races, n_cars), dtype=np.int64)
+        raining = np.zeros((n_races, 1), dtype=bool)
+        rain_chance = self.rain_prob / 10.0
+
+        for lap in range(laps):
+            tyre_age = np.where(boxing[..., lap], 0, tyre_age)
+            if weather_rolls is not None:
+                roll = weather_rolls[:, lap, None]
+                raining = np.where(raining, roll >= 5, roll < rain_chance)
+            is_sc = sc_rolls[:, lap, None] < self.sc_chance
+
+            # --- FREE-AIR LAP (per team) ---
+            t = np.zeros((n_races, n_cars))
+            tire = np.broadcast_to(compound[..., lap], (n_races, n_cars))
+            for team, cols in self.team_cols.items():
+                t[:, cols], fuel[:, cols], _ = self.engines[team].lap_step(
+                    tire[:, cols], tyre_age[:, cols], fuel[:, cols], raining, is_sc, variance_draws[:, cols, lap])
+            pitting = np.broadcast_to(in_lap[..., lap], (n_races, n_cars))
+            t += np.where(pitting, np.where(is_sc, SC_PIT_LOSS, PIT_LOSS), 0.0)
+
+            # --- TRAFFIC ---
+            # Running order on track at the start of the lap; cars on their in-lap go last and are skipped
+            order = np.argsort(np.where(pitting, np.inf, clock), axis=1, kind='stable')
+            ahead = np.roll(order, 1, axis=1)
+            gap = clock[rows, order] - clock[rows, ahead]
+            dirty = (gap < DIRTY_AIR_GAP) & ~is_sc & ~pitting[rows, order]
+            dirty[:, 0] = False
+            t[rows, order] += np.where(dirty, DIRTY_AIR_LOSS * (1 - gap / DIRTY_AIR_GAP), 0.0)
+            arrive = clock + t
+
+            # Front to back: `last` / `second` are the latest and second-latest line crossings so far
+            last = arrive[rows[:, 0], order[:, 0]]
+            second = np.full(n_races, -np.inf)
+            for p in range(1, n_cars):
+                car = order[:, p]
+                on_track = ~pitting[rows[:, 0], car]
+                mine = arrive[rows[:, 0], car]
+
+                advantage = last - mine
+                passes = (advantage > 0) & ~is_sc[:, 0] & \
+                    (pass_rolls[rows[:, 0], car, lap] < 1 - np.exp(-np.maximum(advantage, 0) / self.pass_scale))
+                held = np.where(is_sc[:, 0], last + np.maximum(SC_GAP, gap[:, p] * SC_CLOSE), last + MIN_GAP)
+                mine = np.where(passes, np.maximum(mine, second + MIN_GAP),
+                                np.where(is_sc[:, 0] | (mine < last + MIN_GAP), held, mine))
+                mine = np.where(on_track, mine, arrive[rows[:, 0], car])
+                arrive[rows[:, 0], car] = mine
+
+                behind = on_track & (mine > last)
+                second = np.where(behind, last, np.where(on_track & (mine > second), mine, second))
+                last = np.where(behind, mine, last)
+
+            lap_times[:, :, lap] = arrive - clock
+            np.put_along_axis(positions[:, :, lap], arrive.argsort(axis=1), places, axis=1)
+            rain_hist[:, lap] = raining[:, 0]
+            sc_hist[:, lap] = is_sc[:, 0]
+            clock = arrive
+            tyre_age += 1
+
+        # The grid offset is part of the race: the car starting 20th is 5.7s down before lap 1
+        lap_times[:, :, 0] += np.arange(n_cars) * GRID_SPACING
+        return lap_times, positions, rain_hist, sc_hist
+
+
+def default_field(track_name, rain_prob=0, season=None, cars_per_team=2):
+    # Two cars per team on their best expected strategy, gridded by pace
+    from src.strategy_cache import optimal_strategies
+    team_db = PARAMS.team_db(season)
+    teams = sorted(team_db, key=lambda team: team_db[team]['pace_index'])
+    entries = []
+    for team in teams:
+        best = optimal_strategies(team, track_name, rain_prob, season=season)
+        _, strategy = min(best.one_stop, best.two_stop, key=lambda r: r[0])
+        for i in range(cars_per_team):
+            entries.append(GridEntry(f"{team} #{i + 1}", team, strategy))
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race the full grid on one track.")
+    parser.add_argument('--track', default='Bahrain')
+    parser.add_argument('--rain', type=int, default=0)
+    parser.add_argument('--season', type=int, default=None)
+    parser.add_argument('--races', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    engine = GridRaceEngine(args.track, default_field(args.track, args.rain, args.season), args.rain,
+                            season=args.season)
+    result = engine.simulate(args.races, seed=args.seed)
+    print(f"--- {args.track}: {engine.total_laps} laps x {args.races} races ---")
+    for row in result.summary():
+        print(f"{row['name']:<24} P{row['mean_position']:5.2f}  win {row['win'] * 100:5.1f}%  "
+              f"podium {row['podium'] * 100:5.1f}%  gap {row['mean_gap']:6.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
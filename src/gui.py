@@ -1,14 +1,28 @@
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.patches import Patch
-from PIL import Image
 import os
-import json
-import threading
 import random
+import numpy as np
 from src.simulation import RaceCar
-from src.strategy import StrategyOptimizer
+from src.strategy_cache import optimal_strategies
+from src.undercut import UndercutSolver, format_ranges
+from src.monte_carlo import compare_strategies
+from src.params import PARAMS, COMPOUNDS, race_laps
+from src.jobs import JobRunner
+
+# matplotlib and PIL are imported on first use (first graph / track map), not at startup
+
+
+def new_figure():
+    # Plain Figure, not pyplot: the GUI owns it, so nothing piles up in pyplot's figure registry
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 5), dpi=100)
+    return fig, fig.add_subplot()
+
+
+def embed_figure(fig, master):
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return FigureCanvasTkAgg(fig, master=master)
+
 
 # --- VISUAL CONFIGURATION ---
 ctk.set_appearance_mode("Dark")
@@ -23,6 +37,14 @@ COLOR_HERO = "#00FFFF"  # Cyan
 COLOR_RIVAL = "#FF3399"  # Neon Pink
 COLOR_SC = "#FFFF00"  # Yellow
 
+# How often the Tk loop drains the job queue (ms)
+JOB_POLL_MS = 50
+
+# Race animation: one frame every FRAME_MS; long races advance several laps per frame so a
+# race takes at most ANIMATION_FRAMES frames (F1SimApp.frame_skip overrides)
+FRAME_MS = 100
+ANIMATION_FRAMES = 60
+
 
 # --- MINI GAME CLASS ---
 class MiniGameFrame(ctk.CTkFrame):
@@ -247,7 +269,13 @@ class F1SimApp(ctk.CTk):
         self.teams_list = sorted(self.load_json_keys('team_db.json', ["Red Bull Racing", "Ferrari"]))
         self.tracks_list = sorted(self.load_json_keys('track_db.json', ["Bahrain", "Monza"]))
 
+        # Background work: optimizer / Monte Carlo jobs on a small pool, results drained on the Tk thread
+        self.jobs = JobRunner(workers=2)
+        self.active_job = None
+
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(JOB_POLL_MS, self.poll_jobs)
 
     def setup_ui(self):
         self.grid_columnconfigure(1, weight=1)
@@ -286,7 +314,7 @@ class F1SimApp(ctk.CTk):
 
         self.create_label(self.controls_frame, "CIRCUIT")
         self.track_menu = ctk.CTkOptionMenu(self.controls_frame, values=self.tracks_list, fg_color="#333",
-                                            button_color="#444", command=self.load_track_map)
+                                            button_color="#444", command=self.on_track_change)
         self.track_menu.pack(fill="x", padx=20, pady=5)
 
         self.create_label(self.controls_frame, "METEOROLOGY")
@@ -341,8 +369,17 @@ class F1SimApp(ctk.CTk):
 
         self.run_btn = ctk.CTkButton(self.controls_frame, text="INITIATE SIMULATION", height=50,
                                      fg_color=COLOR_ACCENT, hover_color="#b30500", font=("DIN Alternate", 16, "bold"),
-                                     command=self.start_simulation_thread)
-        self.run_btn.pack(side="bottom", fill="x", padx=20, pady=40)
+                                     command=self.start_simulation)
+        self.run_btn.pack(side="bottom", fill="x", padx=20, pady=(5, 40))
+        self.cancel_btn = ctk.CTkButton(self.controls_frame, text="CANCEL", height=30, fg_color="#444",
+                                        hover_color="#666", state="disabled", command=self.cancel_simulation)
+        self.cancel_btn.pack(side="bottom", fill="x", padx=20)
+        self.progress_label = ctk.CTkLabel(self.controls_frame, text="", font=("Consolas", 10),
+                                           text_color=COLOR_TEXT_DIM)
+        self.progress_label.pack(side="bottom", anchor="w", padx=20)
+        self.progress_bar = ctk.CTkProgressBar(self.controls_frame, height=8, progress_color=COLOR_ACCENT)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="bottom", fill="x", padx=20, pady=(0, 5))
 
         # ================= CENTER PANEL =================
         self.center_panel = ctk.CTkFrame(self, fg_color="transparent")
@@ -356,6 +393,9 @@ class F1SimApp(ctk.CTk):
         self.game_frame = MiniGameFrame(self.center_panel, fg_color="#111", corner_radius=10)
 
         self.current_canvas = None
+        self.views = {}  # name -> (figure, axes, canvas), reused across runs
+        self.animation = None  # (after id, canvas, draw_event cid, blitted artists) of the running race animation
+        self.frame_skip = None  # laps per animation frame; None = auto
         self.verdict_frame = ctk.CTkFrame(self.center_panel, height=100, fg_color="#2b2b2b", corner_radius=10)
         self.verdict_frame.pack(fill="x", pady=(20, 0))
         self.verdict_label = ctk.CTkLabel(self.verdict_frame, text="AWAITING DATA...", font=("Arial", 20, "bold"))
@@ -414,7 +454,7 @@ class F1SimApp(ctk.CTk):
         self.log_box.tag_config("red", foreground="#FF4444")
         self.log_box.tag_config("blue", foreground="#44DDFF")
 
-        self.load_track_map(self.track_menu.get())
+        self.on_track_change(self.track_menu.get())
         self.change_mode("STRATEGY")
 
     # --- UI LOGIC ---
@@ -465,12 +505,25 @@ class F1SimApp(ctk.CTk):
 
     def load_json_keys(self, filename, default_list):
         try:
-            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data', filename)
-            with open(path, 'r') as f:
-                return json.load(f).keys()
+            db = PARAMS.team_db() if filename == 'team_db.json' else PARAMS.track_db()
+            return db.keys()
         except:
             return default_list
 
+    def on_track_change(self, track_name):
+        self.load_track_map(track_name)
+        self.update_pit_sliders(track_name)
+
+    def update_pit_sliders(self, track_name):
+        # Pit laps run from 1 to the last lap before the flag of this track's race
+        last = race_laps(track_name) - 1
+        for slider, label, text in ((self.slider_pit1, self.lbl_pit1, "PIT LAP"),
+                                    (self.slider_pit2, self.lbl_pit2, "PIT 2 LAP")):
+            lap = min(int(slider.get()), last)
+            slider.configure(to=last, number_of_steps=last - 1)
+            slider.set(lap)
+            label.configure(text=f"{text}: {lap}")
+
     def load_track_map(self, track_name):
         base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/tracks')
         filenames = [f"{track_name}.png", f"{track_name.replace(' ', '_')}.png", f"{track_name}.jpg"]
@@ -479,6 +532,7 @@ class F1SimApp(ctk.CTk):
             full_path = os.path.join(base_path, fname)
             if os.path.exists(full_path):
                 try:
+                    from PIL import Image
                     img = ctk.CTkImage(Image.open(full_path), size=(250, 150))
                     self.map_label.configure(image=img, text="")
                     found = True;
@@ -492,55 +546,115 @@ class F1SimApp(ctk.CTk):
         self.log_box.see("end")
 
     # --- SIMULATION ---
-    def start_simulation_thread(self):
-        self.run_btn.configure(state="disabled", text="CALCULATING...", fg_color="#555")
-        self.log_box.delete("0.0", "end")
-        threading.Thread(target=self.run_process).start()
-
-    def run_process(self):
+    # Work runs on the JobRunner pool and only returns data; log lines and progress come back
+    # through its queue and every widget / matplotlib call happens here on the Tk thread.
+    def start_simulation(self):
+        if self.active_job is not None:
+            return
         mode = self.mode_var.get()
         team = self.team_menu.get()
         track = self.track_menu.get()
         rain = int(self.rain_slider.get())
+
+        if mode == "STRATEGY":
+            work, args = self.run_strategy_mode, (team, track, rain)
+        elif mode == "VERSUS":
+            work, args = self.run_versus_mode, (team, self.rival_menu.get(), track, rain)
+        elif mode == "HUMAN vs AI":
+            work, args = self.run_human_vs_ai, (team, track, rain, self.user_strategy())
+        elif mode == "MONTE CARLO":
+            work, args = self.run_monte_carlo_mode, (team, track, rain)
+        else:
+            return
+
+        self.run_btn.configure(state="disabled", text="CALCULATING...", fg_color="#555")
+        self.cancel_btn.configure(state="normal")
+        self.progress_bar.set(0)
+        self.progress_label.configure(text="")
+        self.log_box.delete("0.0", "end")
         self.log_msg(f"MODE: {mode}")
-        try:
-            if mode == "STRATEGY":
-                self.run_strategy_mode(team, track, rain)
-            elif mode == "VERSUS":
-                self.run_versus_mode(team, self.rival_menu.get(), track, rain)
-            elif mode == "HUMAN vs AI":
-                self.run_human_vs_ai(team, track, rain)
-            elif mode == "MONTE CARLO":
-                self.run_monte_carlo_mode(team, track, rain)
-        except Exception as e:
-            self.log_msg(f"ERROR: {e}", "red")
-            import traceback
-            traceback.print_exc()
-        self.run_btn.configure(state="normal", text="INITIATE SIMULATION", fg_color=COLOR_ACCENT)
-
-    def run_strategy_mode(self, team, track, rain):
-        optimizer = StrategyOptimizer(team=team, track=track, rain_prob=rain)
-        t1, s1 = optimizer.find_optimal_1_stop()
-        t2, s2 = optimizer.find_optimal_2_stop()
+        self.active_job = self.jobs.submit(work, *args)
+
+    def cancel_simulation(self):
+        if self.active_job is not None:
+            self.active_job.cancel()
+            self.cancel_btn.configure(state="disabled")
+            self.log_msg("Cancelling...", "yellow")
+
+    def poll_jobs(self):
+        self.jobs.drain(self.on_job_event)
+        self.after(JOB_POLL_MS, self.poll_jobs)
+
+    def on_job_event(self, job, kind, payload):
+        if job is not self.active_job:
+            return  # late events of a job the user already moved on from
+        if kind == 'log':
+            self.log_msg(*payload)
+        elif kind == 'progress':
+            fraction, message = payload
+            self.progress_bar.set(fraction)
+            if message: self.progress_label.configure(text=message)
+        else:
+            self.active_job = None
+            self.run_btn.configure(state="normal", text="INITIATE SIMULATION", fg_color=COLOR_ACCENT)
+            self.cancel_btn.configure(state="disabled")
+            if kind == 'done':
+                self.progress_bar.set(1)
+                show, args = payload
+                show(*args)
+            elif kind == 'cancelled':
+                self.log_msg("Cancelled", "yellow")
+                self.verdict_label.configure(text="CANCELLED", text_color="white")
+            else:
+                error, trace = payload
+                self.log_msg(f"ERROR: {error}", "red")
+                print(trace)
+
+    def on_close(self):
+        self.jobs.shutdown()
+        self.destroy()
+
+    def user_strategy(self):
+        stops = [int(self.slider_pit1.get())]
+        tires = [self.user_tire1.get(), self.user_tire2.get()]
+        if self.use_2stop.get() == 1:
+            stops.append(int(self.slider_pit2.get()));
+            tires.append(self.user_tire3.get());
+            stops.sort()
+        return stops, tires
+
+    # --- JOBS (worker threads: no widget access) ---
+    def solve(self, job, team, track, rain):
+        # Best 1-stop and 2-stop plans, memoised per scenario until the parameter files change
+        best = optimal_strategies(team, track, rain)
+        size = best.search_size
+        source = "cached" if best.cached else f"DP {size['dp_states'] / 1e6:.2f}M states"
+        job.log(f"{team} @ {track}: {size['laps']} laps | {source}", "blue")
+        return best.one_stop, best.two_stop
+
+    def run_strategy_mode(self, job, team, track, rain):
+        (t1, s1), (t2, s2) = self.solve(job, team, track, rain)
+        job.progress(0.5, "Racing both plans")
         if t2 < t1:
             win, col, det = "2-STOP WINS", COLOR_RIVAL, f"Gap: -{(t1 - t2) * 60:.1f}s"
         else:
             win, col, det = "1-STOP WINS", COLOR_HERO, f"Gap: -{(t2 - t1) * 60:.1f}s"
-        self.verdict_label.configure(text=f"{win}\n{det}", text_color=col)
-        self.lbl_hero_name.configure(text="1-STOP STRATEGY", text_color=COLOR_HERO)
-        self.lbl_rival_name.configure(text="2-STOP STRATEGY", text_color=COLOR_RIVAL)
-        self.animate_graph(self.run_single_race(team, track, rain, s1), self.run_single_race(team, track, rain, s2),
-                           "1-Stop", "2-Stop", f"{team} Strategy")
-
-    def run_versus_mode(self, hero, rival, track, rain):
-        opt_h = StrategyOptimizer(team=hero, track=track, rain_prob=rain)
-        t1, s1 = opt_h.find_optimal_1_stop();
-        t2, s2 = opt_h.find_optimal_2_stop()
-        h_strat = s2 if t2 < t1 else s1
-        opt_r = StrategyOptimizer(team=rival, track=track, rain_prob=rain)
-        rt1, rs1 = opt_r.find_optimal_1_stop();
-        rt2, rs2 = opt_r.find_optimal_2_stop()
-        r_strat = rs2 if rt2 < rt1 else rs1
+        c1 = self.run_single_race(team, track, rain, s1)
+        c2 = self.run_single_race(team, track, rain, s2)
+        return self.show_race, (c1, c2, "1-Stop", "2-Stop", f"{team} Strategy", f"{win}\n{det}", col,
+                                "1-STOP STRATEGY", "2-STOP STRATEGY")
+
+    def run_versus_mode(self, job, hero, rival, track, rain):
+        # Both cars pick their stop lap knowing the other one does too (src/undercut.py)
+        job.log("Solving the pit game on the grid simulator...")
+        eq = UndercutSolver(hero, rival, track, rain).solve(
+            progress=lambda f: job.progress(0.9 * f, f"Payoff matrix {f * 100:.0f}%"))
+        h_strat, r_strat = eq.hero_strategy, eq.rival_strategy
+        kind = "Equilibrium" if eq.converged else "Mixed equilibrium (most played)"
+        job.log(f"{kind}: {hero} L{h_strat[0]} vs {rival} L{r_strat[0]} | exp. gap {eq.delta:+.1f}s", "blue")
+        job.log(f"{hero} undercut {format_ranges(eq.hero_undercut)} | overcut {format_ranges(eq.hero_overcut)}")
+        job.log(f"{rival} undercut {format_ranges(eq.rival_undercut)} | overcut {format_ranges(eq.rival_overcut)}")
+        job.progress(0.9, "Racing the equilibrium plans")
         c_hero = self.run_single_race(hero, track, rain, h_strat)
         c_rival = self.run_single_race(rival, track, rain, r_strat)
         diff = abs(c_hero.total_race_time - c_rival.total_race_time)
@@ -548,134 +662,182 @@ class F1SimApp(ctk.CTk):
             win, col = f"{hero.upper()} WINS", COLOR_HERO
         else:
             win, col = f"{rival.upper()} WINS", COLOR_RIVAL
-        self.verdict_label.configure(text=f"{win}\nGap: {diff:.1f}s", text_color=col)
-        self.lbl_hero_name.configure(text=hero.upper(), text_color=COLOR_HERO)
-        self.lbl_rival_name.configure(text=rival.upper(), text_color=COLOR_RIVAL)
-        self.animate_graph(c_hero, c_rival, hero, rival, f"{hero} vs {rival}")
-
-    def run_human_vs_ai(self, team, track, rain):
-        opt = StrategyOptimizer(team=team, track=track, rain_prob=rain)
-        t1, s1 = opt.find_optimal_1_stop();
-        t2, s2 = opt.find_optimal_2_stop()
+        return self.show_race, (c_hero, c_rival, hero, rival, f"{hero} vs {rival}", f"{win}\nGap: {diff:.1f}s", col,
+                                hero.upper(), rival.upper())
+
+    def run_human_vs_ai(self, job, team, track, rain, user_strategy):
+        (t1, s1), (t2, s2) = self.solve(job, team, track, rain)
         ai_strat = s2 if t2 < t1 else s1
-        stops = [int(self.slider_pit1.get())]
-        tires = [self.user_tire1.get(), self.user_tire2.get()]
-        if self.use_2stop.get() == 1:
-            stops.append(int(self.slider_pit2.get()));
-            tires.append(self.user_tire3.get());
-            stops.sort()
-        c_human = self.run_single_race(team, track, rain, (stops, tires))
+        job.progress(0.5, "Racing both plans")
+        c_human = self.run_single_race(team, track, rain, user_strategy)
         c_ai = self.run_single_race(team, track, rain, ai_strat)
         diff = abs(c_human.total_race_time - c_ai.total_race_time)
         if c_human.total_race_time < c_ai.total_race_time:
             win, col = "USER WINS!", COLOR_HERO
         else:
             win, col = "AI MODEL WINS", COLOR_RIVAL
-        self.verdict_label.configure(text=f"{win}\nGap: {diff:.1f}s", text_color=col)
-        self.lbl_hero_name.configure(text="USER STRATEGY", text_color=COLOR_HERO)
-        self.lbl_rival_name.configure(text="AI STRATEGY", text_color=COLOR_RIVAL)
-        self.animate_graph(c_human, c_ai, "User Strategy", "AI Strategy", f"Man vs Machine: {team}")
-
-    def run_monte_carlo_mode(self, team, track, rain):
-        self.log_msg("Running 500 Simulations...")
-        opt = StrategyOptimizer(team=team, track=track, rain_prob=rain)
-        _, s1 = opt.find_optimal_1_stop();
-        _, s2 = opt.find_optimal_2_stop()
-        w1, w2 = 0, 0
-        for _ in range(500):
-            if self.run_single_race(team, track, rain, s1).total_race_time < self.run_single_race(team, track, rain,
-                                                                                                  s2).total_race_time:
-                w1 += 1
-            else:
-                w2 += 1
-        if self.current_canvas: self.current_canvas.get_tk_widget().destroy()
-        fig, ax = plt.subplots(figsize=(8, 5), dpi=100);
-        fig.patch.set_facecolor('#2b2b2b')
-        ax.pie([w1, w2], labels=[f'1-Stop ({w1 / 5:.1f}%)', f'2-Stop ({w2 / 5:.1f}%)'],
+        return self.show_race, (c_human, c_ai, "User Strategy", "AI Strategy", f"Man vs Machine: {team}",
+                                f"{win}\nGap: {diff:.1f}s", col, "USER STRATEGY", "AI STRATEGY")
+
+    def run_monte_carlo_mode(self, job, team, track, rain):
+        job.log("Running Adaptive Monte Carlo...")
+        (_, s1), (_, s2) = self.solve(job, team, track, rain)
+
+        def report(fraction, partial):
+            job.progress(fraction, f"N={partial.n} | 1-Stop win {partial.win_prob_a * 100:.1f}%")
+
+        # Samples in paired batches until the 1-stop win-probability 95% CI is under 4% wide (or 5s pass)
+        mc = compare_strategies(team, track, rain, s1, s2, tolerance=0.04, time_budget=5.0, progress=report)
+        job.log(f"N={mc.n} in {mc.elapsed * 1000:.0f}ms", "blue")
+        job.log(f"1-Stop win: {mc.win_prob_a * 100:.1f}% (95% CI {mc.win_ci[0] * 100:.1f}-{mc.win_ci[1] * 100:.1f}%)")
+        job.log(f"Mean gap: {mc.mean_delta:+.1f}s ({mc.delta_ci[0]:+.1f} to {mc.delta_ci[1]:+.1f}s)")
+        if not mc.converged: job.log("Budget hit before CI converged", "yellow")
+        return self.show_monte_carlo, (mc,)
+
+    # --- RESULTS (Tk thread) ---
+    def show_race(self, c1, c2, l1, l2, title, verdict, color, name1, name2):
+        self.verdict_label.configure(text=verdict, text_color=color)
+        self.lbl_hero_name.configure(text=name1, text_color=COLOR_HERO)
+        self.lbl_rival_name.configure(text=name2, text_color=COLOR_RIVAL)
+        self.animate_graph(c1, c2, l1, l2, title)
+
+    def show_monte_carlo(self, mc):
+        w1, w2, n = mc.wins_a, mc.wins_b, mc.n
+        self.stop_animation()
+        fig, ax, canvas = self.show_view('monte_carlo')
+        ax.clear()
+        ax.pie([w1, w2], labels=[f'1-Stop ({w1 / n * 100:.1f}%)', f'2-Stop ({w2 / n * 100:.1f}%)'],
                colors=[COLOR_HERO, COLOR_RIVAL], autopct='%1.1f%%', startangle=90, textprops={'color': "white"})
-        ax.set_title(f"Monte Carlo Analysis (N=500)", color='white')
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame);
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill="both", expand=True)
-        self.current_canvas = canvas;
+        ax.set_title(f"Monte Carlo Analysis (N={n})", color='white')
+        canvas.draw()
         self.verdict_label.configure(text="PROBABILITY CALCULATED", text_color="white")
 
+    # --- GRAPHS (Tk thread) ---
+    def show_view(self, name):
+        # One persistent figure + canvas per view, swapped in the graph frame instead of rebuilt
+        if name not in self.views:
+            fig, ax = new_figure()
+            fig.patch.set_facecolor('#2b2b2b')
+            self.views[name] = (fig, ax, embed_figure(fig, self.graph_frame))
+        fig, ax, canvas = self.views[name]
+        if self.current_canvas is not canvas:
+            if self.current_canvas: self.current_canvas.get_tk_widget().pack_forget()
+            canvas.get_tk_widget().pack(fill="both", expand=True)
+            self.current_canvas = canvas
+        return fig, ax, canvas
+
+    def stop_animation(self):
+        if self.animation is not None:
+            after_id, canvas, draw_cid, artists = self.animation
+            self.after_cancel(after_id)
+            self.animation = None
+            self.release_artists(canvas, draw_cid, artists)
+
+    def release_artists(self, canvas, draw_cid, artists):
+        # Hand the blitted artists back to normal rendering, so full redraws (resize, re-showing
+        # the view) keep the lines / markers / SC shading where the animation left them
+        canvas.mpl_disconnect(draw_cid)
+        for artist in artists: artist.set_animated(False)
+        canvas.draw_idle()
+
     def paint_tire_zones(self, ax, history):
+        from matplotlib.patches import Patch
         colors = {'SOFT': ('#ff3333', 0.15), 'MEDIUM': ('#ffff33', 0.15), 'HARD': ('#ffffff', 0.1),
                   'INTER': ('#33ccff', 0.2)}
         patches = [Patch(facecolor=c[0], alpha=0.3, label=n) for n, c in colors.items()]
         ax.add_artist(ax.legend(handles=patches, loc='upper center', ncol=4, frameon=False, labelcolor='white'))
-        start = 0;
-        cur = history[0]['Compound']
-        for i, lap in enumerate(history):
-            if lap['Compound'] != cur or i == len(history) - 1:
-                c = colors.get(cur, ('#333', 0.1))
-                ax.axvspan(start, i, facecolor=c[0], alpha=c[1]);
-                cur = lap['Compound'];
-                start = i
+        codes = history.column('Compound')
+        change = np.flatnonzero(np.diff(codes)) + 1
+        for start, end in zip(np.r_[0, change], np.r_[change, len(codes) - 1]):
+            c = colors.get(COMPOUNDS[codes[start]], ('#333', 0.1))
+            ax.axvspan(start, end, facecolor=c[0], alpha=c[1])
 
     def animate_graph(self, c1, c2, l1, l2, title):
-        if self.current_canvas: self.current_canvas.get_tk_widget().destroy()
-        fig, ax = plt.subplots(figsize=(8, 5), dpi=100);
-        fig.patch.set_facecolor('#2b2b2b');
+        # Static layers (tyre zones, axes, legend) are rendered once; each frame restores that
+        # background and blits only the animated lines / markers.
+        self.stop_animation()
+        fig, ax, canvas = self.show_view('race')
+        h1, h2 = c1.history, c2.history
+        n_laps = len(h1)
+        laps = np.arange(1, n_laps + 1)
+        times1, times2 = h1.column('Time'), h2.column('Time')
+        pits1, pits2 = np.flatnonzero(h1.column('PitStop')), np.flatnonzero(h2.column('PitStop'))
+        sc_laps = np.flatnonzero(h1.column('SC'))
+        ymin = min(times1.min(), times2.min()) - 5
+        ymax = max(times1.max(), times2.max()) + 5
+        # SC markers as one NaN-separated polyline: [lap, lap, nan] x [ymin, ymax, nan] per SC lap
+        sc_x = np.repeat(sc_laps + 1.0, 3)
+        sc_x[2::3] = np.nan
+        sc_y = np.tile([ymin, ymax, np.nan], len(sc_laps))
+
+        ax.clear()
         ax.set_facecolor('#2b2b2b')
-        self.paint_tire_zones(ax, c1.history)
-        line1, = ax.plot([], [], color=COLOR_HERO, label=l1, linewidth=2.5)
-        line2, = ax.plot([], [], color=COLOR_RIVAL, label=l2, linewidth=2.5)
-        ax.set_xlim(0, 58);
-        times = [x['Time'] for x in c1.history] + [x['Time'] for x in c2.history];
-        ax.set_ylim(min(times) - 5, max(times) + 5)
+        self.paint_tire_zones(ax, h1)
+        line1, = ax.plot([], [], color=COLOR_HERO, label=l1, linewidth=2.5, animated=True)
+        line2, = ax.plot([], [], color=COLOR_RIVAL, label=l2, linewidth=2.5, animated=True)
+        stops1, = ax.plot([], [], 'o', color='white', markeredgecolor=COLOR_HERO, zorder=5, animated=True)
+        stops2, = ax.plot([], [], 'o', color='white', markeredgecolor=COLOR_RIVAL, zorder=5, animated=True)
+        sc_line, = ax.plot([], [], color=COLOR_SC, alpha=0.8, linestyle='--', animated=True)
+        artists = [sc_line, line1, line2, stops1, stops2]
+        ax.set_xlim(0, n_laps + 1);
+        ax.set_ylim(ymin, ymax)
         ax.set_title(title, color='white', fontweight='bold');
         ax.set_ylabel("Lap Time (s)", color='white');
         ax.set_xlabel("Lap Number", color='white')
         ax.tick_params(colors='white');
         ax.grid(True, color='#444', linestyle='--', alpha=0.5)
-        ax.legend(facecolor='#2b2b2b', edgecolor='white', labelcolor='white')
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame);
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill="both", expand=True);
-        self.current_canvas = canvas
-
-        def update(frame):
-            if frame >= len(c1.history): return
-            line1.set_data(range(1, frame + 2), [x['Time'] for x in c1.history[:frame + 1]])
-            line2.set_data(range(1, frame + 2), [x['Time'] for x in c2.history[:frame + 1]])
-
-            def update_car_stats(history, bar, lbl_health, lbl_stats):
-                lap = history[frame]
-                health = lap.get('Health', 100);
-                fuel = lap.get('Fuel', 0);
-                pace = lap['Time']
-                bar.set(health / 100.0)
-                color = "green" if health > 50 else "orange" if health > 20 else "red"
-                bar.configure(progress_color=color)
-                lbl_health.configure(text=f"TIRES: {health}%", text_color=color)
-                lbl_stats.configure(text=f"PACE: {pace:.1f}s | FUEL: {fuel:.1f}kg")
-
-            update_car_stats(c1.history, self.bar_hero_tire, self.lbl_hero_health, self.lbl_hero_stats)
-            update_car_stats(c2.history, self.bar_rival_tire, self.lbl_rival_health, self.lbl_rival_stats)
-
-            h_lap = c1.history[frame]
-            if h_lap.get('SC'): self.log_msg(f"L{frame + 1}: SAFETY CAR", "red"); ax.axvline(x=frame + 1,
-                                                                                             color=COLOR_SC, alpha=0.8,
-                                                                                             linestyle='--')
-            if h_lap.get('PitStop'): self.log_msg(f"L{frame + 1} [{l1}]: BOX!", "yellow"); ax.plot(frame, h_lap['Time'],
-                                                                                                   'o', color='white',
-                                                                                                   markeredgecolor=COLOR_HERO,
-                                                                                                   zorder=5)
-            if c2.history[frame].get('PitStop'): self.log_msg(f"L{frame + 1} [{l2}]: BOX!", "yellow"); ax.plot(frame,
-                                                                                                               c2.history[
-                                                                                                                   frame][
-                                                                                                                   'Time'],
-                                                                                                               'o',
-                                                                                                               color='white',
-                                                                                                               markeredgecolor=COLOR_RIVAL,
-                                                                                                               zorder=5)
-
-            canvas.draw()
-            self.after(100, update, frame + 1)
-
-        self.after(100, update, 0)
+        ax.legend(handles=[line1, line2], facecolor='#2b2b2b', edgecolor='white', labelcolor='white')
+
+        # Any full redraw (first render, window resize) re-captures the background
+        background = {}
+
+        def on_draw(event):
+            background['ax'] = canvas.copy_from_bbox(ax.bbox)
+            for artist in artists: ax.draw_artist(artist)
+
+        draw_cid = canvas.mpl_connect('draw_event', on_draw)
+        canvas.draw()
+
+        def update_car_stats(history, i, bar, lbl_health, lbl_stats):
+            health = int(history.column('Health')[i]);
+            fuel = history.column('Fuel')[i];
+            pace = history.column('Time')[i]
+            bar.set(health / 100.0)
+            color = "green" if health > 50 else "orange" if health > 20 else "red"
+            bar.configure(progress_color=color)
+            lbl_health.configure(text=f"TIRES: {health}%", text_color=color)
+            lbl_stats.configure(text=f"PACE: {pace:.1f}s | FUEL: {fuel:.1f}kg")
+
+        skip = self.frame_skip or max(1, -(-n_laps // ANIMATION_FRAMES))
+
+        def update(shown, prev):
+            # shown = laps on screen after this frame, prev = laps shown before it
+            line1.set_data(laps[:shown], times1[:shown])
+            line2.set_data(laps[:shown], times2[:shown])
+            k1, k2 = np.searchsorted(pits1, shown), np.searchsorted(pits2, shown)
+            stops1.set_data(pits1[:k1] + 1, times1[pits1[:k1]])
+            stops2.set_data(pits2[:k2] + 1, times2[pits2[:k2]])
+            k_sc = np.searchsorted(sc_laps, shown)
+            sc_line.set_data(sc_x[:3 * k_sc], sc_y[:3 * k_sc])
+
+            canvas.restore_region(background['ax'])
+            for artist in artists: ax.draw_artist(artist)
+            canvas.blit(ax.bbox)
+
+            update_car_stats(h1, shown - 1, self.bar_hero_tire, self.lbl_hero_health, self.lbl_hero_stats)
+            update_car_stats(h2, shown - 1, self.bar_rival_tire, self.lbl_rival_health, self.lbl_rival_stats)
+            for i in sc_laps[np.searchsorted(sc_laps, prev):k_sc]: self.log_msg(f"L{i + 1}: SAFETY CAR", "red")
+            for i in pits1[np.searchsorted(pits1, prev):k1]: self.log_msg(f"L{i + 1} [{l1}]: BOX!", "yellow")
+            for i in pits2[np.searchsorted(pits2, prev):k2]: self.log_msg(f"L{i + 1} [{l2}]: BOX!", "yellow")
+
+            if shown < n_laps:
+                self.animation = (self.after(FRAME_MS, update, min(shown + skip, n_laps), shown), canvas, draw_cid,
+                                  artists)
+            else:
+                self.animation = None
+                self.release_artists(canvas, draw_cid, artists)
+
+        self.animation = (self.after(FRAME_MS, update, min(skip, n_laps), 0), canvas, draw_cid, artists)
 
     def run_single_race(self, team, track, rain, strategy):
         car = RaceCar(team, track, rain)
@@ -683,7 +845,7 @@ class F1SimApp(ctk.CTk):
         stops = strategy[0] if isinstance(strategy[0], list) else [strategy[0]]
         tires = strategy[1];
         t_idx = 0
-        for lap in range(1, 58):
+        for lap in range(1, race_laps(track) + 1):
             reason = "Scheduled"
             if car.history and car.history[-1].get('SC'):
                 reason = "SC ADVANTAGE"
@@ -0,0 +1,134 @@
+import numpy as np
+from src.params import COMPOUNDS, COMPOUND_CODE
+
+# Column name -> dtype. Same keys the old per-lap dicts used.
+HISTORY_COLUMNS = {
+    'Lap': np.int16,
+    'Time': np.float64,
+    'Compound': np.int8,
+    'TyreAge': np.int16,
+    'Rain': bool,
+    'SC': bool,
+    'Fuel': np.float32,
+    'Health': np.int16,
+    'PitStop': bool,
+    'PitReason': np.int8,
+}
+
+# PitReason codes (0 = no stop). New reasons are registered on first use.
+PIT_REASONS = [None, "Scheduled", "SC ADVANTAGE", "WET TRACK"]
+
+
+def pit_reason_code(reason):
+    if reason not in PIT_REASONS:
+        PIT_REASONS.append(reason)
+    return PIT_REASONS.index(reason)
+
+
+class LapView:
+    # Dict-like view of one lap, so history[i]['Time'] and .get('SC') keep working
+    __slots__ = ('history', 'index')
+
+    def __init__(self, history, index):
+        self.history = history
+        self.index = index
+
+    def __getitem__(self, key):
+        value = self.history.columns[key][self.index]
+        if key == 'Compound':
+            return COMPOUNDS[value]
+        if key == 'PitReason':
+            return PIT_REASONS[value]
+        return value.item()
+
+    def __setitem__(self, key, value):
+        if key == 'Compound':
+            value = COMPOUND_CODE[value]
+        elif key == 'PitReason':
+            value = pit_reason_code(value)
+        self.history.columns[key][self.index] = value
+
+    def get(self, key, default=None):
+        if key not in HISTORY_COLUMNS:
+            return default
+        return self[key]
+
+    def keys(self):
+        return HISTORY_COLUMNS.keys()
+
+    def __contains__(self, key):
+        return key in HISTORY_COLUMNS
+
+    def to_dict(self):
+        return {key: self[key] for key in HISTORY_COLUMNS}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class LapHistory:
+    # Struct-of-arrays lap history: one preallocated NumPy column per field
+    def __init__(self, capacity=80):
+        self.size = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in HISTORY_COLUMNS.items()}
+
+    @classmethod
+    def from_columns(cls, **columns):
+        n = len(columns['Lap'])
+        history = cls(capacity=n)
+        for name, values in columns.items():
+            history.columns[name][:] = values
+        history.size = n
+        return history
+
+    def append(self, lap, time, compound, tyre_age, rain, sc, fuel, health):
+        if self.size == len(self.columns['Lap']):
+            self.grow()
+
+        i = self.size
+        cols = self.columns
+        cols['Lap'][i] = lap
+        cols['Time'][i] = time
+        cols['Compound'][i] = COMPOUND_CODE[compound]
+        cols['TyreAge'][i] = tyre_age
+        cols['Rain'][i] = rain
+        cols['SC'][i] = sc
+        cols['Fuel'][i] = fuel
+        cols['Health'][i] = health
+        self.size += 1
+
+    def grow(self):
+        for name, col in self.columns.items():
+            self.columns[name] = np.concatenate([col, np.zeros_like(col)])
+
+    def add_pit(self, pit_loss, reason):
+        # Pit loss is booked on the last completed lap
+        i = self.size - 1
+        self.columns['Time'][i] += pit_loss
+        self.columns['PitStop'][i] = True
+        self.columns['PitReason'][i] = pit_reason_code(reason)
+
+    def column(self, name):
+        # Read-only NumPy view of the recorded laps (no copy)
+        view = self.columns[name][:self.size]
+        view.flags.writeable = False
+        return view
+
+    def compounds(self):
+        return [COMPOUNDS[c] for c in self.column('Compound')]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield LapView(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [LapView(self, i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("lap history index out of range")
+        return LapView(self, index)
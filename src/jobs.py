@@ -0,0 +1,94 @@
+import itertools
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for the GUI. Workers never touch Tk: everything they want to show goes into
+# one queue as (job, kind, payload) events, which the Tk main loop drains with `after`.
+#   kind = 'log'       payload (message, color)
+#          'progress'  payload (fraction 0..1, message or None)
+#          'done'      payload = the work function's return value
+#          'cancelled' payload None
+#          'error'     payload (exception, formatted traceback)
+# Cancellation is cooperative: the work function calls job.progress() / job.check() between
+# steps, which raise JobCancelled once job.cancel() was called.
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, events):
+        self.id = job_id
+        self.events = events
+        self.future = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def log(self, message, color="white"):
+        self.events.put((self, 'log', (message, color)))
+
+    def progress(self, fraction, message=None):
+        self.check()
+        self.events.put((self, 'progress', (min(max(fraction, 0.0), 1.0), message)))
+
+
+class JobRunner:
+    def __init__(self, workers=2):
+        self.events = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sim-job')
+        self.ids = itertools.count(1)
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        # Runs fn(job, *args, **kwargs) on the pool and returns the Job handle
+        job = Job(next(self.ids), self.events)
+        with self.lock:
+            self.active.add(job)
+        job.future = self.executor.submit(self.run, job, fn, args, kwargs)
+        return job
+
+    def run(self, job, fn, args, kwargs):
+        try:
+            job.check()  # cancelled while still queued
+            self.events.put((job, 'done', fn(job, *args, **kwargs)))
+        except JobCancelled:
+            self.events.put((job, 'cancelled', None))
+        except Exception as e:
+            self.events.put((job, 'error', (e, traceback.format_exc())))
+        finally:
+            with self.lock:
+                self.active.discard(job)
+
+    def drain(self, handler, max_events=200):
+        # Main thread only: hands queued events to handler(job, kind, payload). Capped per call
+        # so a chatty job can't starve the Tk event loop.
+        for handled in range(max_events):
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return handled
+            handler(*event)
+        return max_events
+
+    def cancel_all(self):
+        with self.lock:
+            for job in self.active:
+                job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from src.params import PROJECT_ROOT, DATA_DIR
+
+# Columnar lap store: one uncompressed Feather (Arrow IPC) file per race, so reads are
+# memory-mapped and only touch the requested columns.
+#   data/laps/index.json           -> season index (year, gp, path, rows, source csv + its hash)
+#   data/laps/<year>/<gp>.feather  -> one partition per Grand Prix
+# Readers call sync_season first, so race CSVs added or edited after the ingest (e.g. by the
+# miner after a race weekend) are picked up instead of silently ignored.
+STORE_DIR = os.path.join(DATA_DIR, 'laps')
+INDEX_FILE = 'index.json'
+
+# Compact dtypes. LapTime ("0 days 00:01:36.748000") is dropped: LapTimeSec carries the same value.
+# TyreLife stays float32 because a few laps have no tyre data (NaN). Laps without a LapNumber /
+# Stint (FastF1 leaves some incomplete stints blank) are dropped before the int8 cast.
+LAP_DTYPES = {
+    'Driver': 'category',
+    'Team': 'category',
+    'Compound': 'category',
+    'LapNumber': 'int8',
+    'Stint': 'int8',
+    'TyreLife': 'float32',
+    'LapTimeSec': 'float32',
+}
+INT_COLUMNS = [col for col, dtype in LAP_DTYPES.items() if dtype.startswith('int')]
+
+
+def season_csv_dir(year, session_type='R'):
+    # Same layout as src/data_miner.py: races in season_<year>, other sessions in season_<year>_<type>
+    suffix = '' if session_type == 'R' else f'_{session_type}'
+    return os.path.join(DATA_DIR, f'season_{year}{suffix}')
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def to_columnar(df):
+    df = df.drop(columns=['LapTime'], errors='ignore')
+    df = df.dropna(subset=[c for c in INT_COLUMNS if c in df.columns])
+    for col, dtype in LAP_DTYPES.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df.reset_index(drop=True)
+
+
+def read_index(store_dir=STORE_DIR):
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)['partitions']
+
+
+def write_index(partitions, store_dir=STORE_DIR):
+    partitions = sorted(partitions, key=lambda p: (p['year'], p['gp']))
+    tmp_path = os.path.join(store_dir, INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'partitions': partitions}, f, indent=4)
+    os.replace(tmp_path, os.path.join(store_dir, INDEX_FILE))
+
+
+def ingest_race(csv_path, year, gp, store_dir=STORE_DIR):
+    import pyarrow.feather as feather
+
+    df = to_columnar(pd.read_csv(csv_path))
+
+    rel_path = os.path.join(str(year), f'{gp}.feather')
+    os.makedirs(os.path.join(store_dir, str(year)), exist_ok=True)
+    feather.write_feather(df, os.path.join(store_dir, rel_path), compression='uncompressed')
+
+    return {
+        'year': int(year), 'gp': gp, 'path': rel_path, 'rows': len(df),
+        'columns': list(df.columns), 'source': os.path.relpath(csv_path, PROJECT_ROOT),
+        'source_hash': file_hash(csv_path)
+    }
+
+
+def ingest_season(year=2023, source_dir=None, store_dir=STORE_DIR):
+    # Converts data/season_<year>/*_Clean.csv into the columnar store and updates the index
+    source_dir = source_dir or season_csv_dir(year)
+    print(f"--- INGESTING {year} INTO {store_dir} ---")
+
+    partitions = [p for p in read_index(store_dir) if p['year'] != year]
+    for file in sorted(os.listdir(source_dir)):
+        if not file.endswith('_Clean.csv'):
+            continue
+        gp = file.replace('_Clean.csv', '')
+        part = ingest_race(os.path.join(source_dir, file), year, gp, store_dir)
+        partitions.append(part)
+        print(f"[STORED] {year} {gp}: {part['rows']} laps")
+
+    write_index(partitions, store_dir)
+    return partitions
+
+
+def sync_season(year, source_dir=None, store_dir=STORE_DIR):
+    # Re-ingests the season's race CSVs that are missing from the index or changed since they
+    # were stored. Returns the updated GPs.
+    source_dir = source_dir or season_csv_dir(year)
+    if not os.path.isdir(source_dir):
+        return []
+
+    partitions = read_index(store_dir)
+    stored = {p['gp']: p.get('source_hash') for p in partitions if p['year'] == year}
+    updated = []
+    for file in sorted(os.listdir(source_dir)):
+        if not file.endswith('_Clean.csv'):
+            continue
+        gp = file.replace('_Clean.csv', '')
+        csv_path = os.path.join(source_dir, file)
+        if stored.get(gp) == file_hash(csv_path):
+            continue
+        part = ingest_race(csv_path, year, gp, store_dir)
+        partitions = [p for p in partitions if (p['year'], p['gp']) != (year, gp)] + [part]
+        updated.append(gp)
+        print(f"[STORED] {year} {gp}: {part['rows']} laps ({'changed' if gp in stored else 'new'} source)")
+
+    if updated:
+        write_index(partitions, store_dir)
+    return updated
+
+
+def has_season(year, store_dir=STORE_DIR):
+    return any(p['year'] == year for p in read_index(store_dir))
+
+
+def season_gps(year, store_dir=STORE_DIR):
+    return [p['gp'] for p in read_index(store_dir) if p['year'] == year]
+
+
+def read_partition(part, columns=None, store_dir=STORE_DIR):
+    import pyarrow.feather as feather
+
+    if columns is not None:
+        columns = [c for c in columns if c in part['columns']]
+    return feather.read_table(os.path.join(store_dir, part['path']), columns=columns, memory_map=True)
+
+
+def select_partitions(years=None, gps=None, store_dir=STORE_DIR):
+    return [p for p in read_index(store_dir)
+            if (years is None or p['year'] in years) and (gps is None or p['gp'] in gps)]
+
+
+def iter_races(years=None, gps=None, columns=None, store_dir=STORE_DIR):
+    # Yields (year, gp, DataFrame) for the selected partitions only
+    for part in select_partitions(years, gps, store_dir):
+        yield part['year'], part['gp'], read_partition(part, columns, store_dir).to_pandas()
+
+
+def load_laps(years=None, gps=None, columns=None, store_dir=STORE_DIR):
+    # One frame for the selection, with Year / GP as partition columns.
+    # Tables are concatenated in Arrow and converted to pandas once.
+    import pyarrow as pa
+
+    tables = []
+    for part in select_partitions(years, gps, store_dir):
+        table = read_partition(part, columns, store_dir)
+        n = table.num_rows
+        table = table.append_column('Year', pa.array([part['year']] * n, pa.int16()))
+        table = table.append_column('GP', pa.DictionaryArray.from_arrays(pa.array([0] * n, pa.int8()), [part['gp']]))
+        tables.append(table)
+
+    if not tables:
+        return pd.DataFrame(columns=list(columns or []) + ['Year', 'GP'])
+
+    return pa.concat_tables(tables, promote_options='permissive').to_pandas()
+
+
+if __name__ == "__main__":
+    ingest_season(2023)
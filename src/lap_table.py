@@ -0,0 +1,139 @@
+import threading
+import numpy as np
+from src.simulation import RaceCar, safety_car_chance
+from src.engine import COMPOUNDS, COMPOUND_CODE, normalize_strategy
+from src.params import get_car_params, race_laps, TYRE_AGE_LIMIT
+
+# Fuel burn multiplier for push (SOFT) / cruise (HARD) laps, same as RaceCar.simulate_lap
+BURN_FACTOR = {'SOFT': 1.05, 'HARD': 0.95}
+
+
+def rain_probabilities(rain_prob, total_laps, start_lap=0, raining=False):
+    # P(raining on lap j) for the RaceCar weather chain, from the weather at the start of
+    # lap `start_lap` (0-indexed; dry race start by default). Earlier laps are left at 0.
+    p_start = rain_prob / 1000.0  # roll < rain_prob / 10 out of 100
+    p_stop = 0.05
+    probs = np.zeros(total_laps)
+    p = 1.0 if raining else 0.0
+    for j in range(start_lap, total_laps):
+        p = p * (1 - p_stop) + (1 - p) * p_start
+        probs[j] = p
+    return probs
+
+
+def expected_lap_costs(car, total_laps, compounds, p_rain=None):
+    # Expected lap time of lap j (0-indexed) on compound c with tyre age a: shape (laps, C, ages).
+    # Fuel is linear in the laps already burned, so its cost is split per lap: every kg burned
+    # on lap j saves fuel_penalty on each of the (total_laps - j - 1) laps after it.
+    # p_rain: per-lap rain probabilities (default: the chain from a dry start)
+    p_sc = safety_car_chance(car.track_name) / 100.0
+    if p_rain is None:
+        p_rain = rain_probabilities(car.rain_prob, total_laps)
+    p_rain = np.asarray(p_rain)[:, None, None]
+
+    laps = np.arange(total_laps)[:, None, None]
+    ages = np.arange(total_laps + 1)[None, None, :]
+    offsets = np.array([car.tire_pace_offsets[c] for c in compounds])[None, :, None]
+    deg = np.array([car.tire_deg_coeffs[c] for c in compounds])[None, :, None]
+    is_inter = np.array([c == 'INTER' for c in compounds])[None, :, None]
+
+    # 1. Base pace + fuel at the start line
+    cost = car.base_lap_time + car.current_fuel * car.fuel_penalty + offsets
+
+    # 2. Weather
+    cost = cost + p_rain * np.where(is_inter, 10.0, 30.0) + (1 - p_rain) * np.where(is_inter, 5.0, 0.0)
+
+    # 3. Safety car
+    cost = cost + 40.0 * p_sc
+
+    # 4. Degradation (20% while under SC)
+    cost = cost + ages * deg * (p_sc * 0.2 + (1 - p_sc))
+
+    # 5. Cliff (not under SC)
+    codes = np.array([COMPOUND_CODE[c] for c in compounds])[:, None]
+    cliff = car.cliff_table[codes, np.minimum(ages[0], TYRE_AGE_LIMIT)][None]
+    cost = cost + cliff * (1 - p_sc)
+
+    # 6. Fuel burned this lap (lap variance averages out)
+    push = np.array([BURN_FACTOR.get(c, 1.0) for c in compounds])[None, :, None]
+    burn = car.base_burn_rate * (p_sc * 0.4 + (1 - p_sc) * (p_rain * 0.85 + (1 - p_rain) * push))
+    cost = cost - car.fuel_penalty * burn * (total_laps - 1 - laps)
+
+    return cost
+
+
+def expected_pit_loss(car):
+    p_sc = safety_car_chance(car.track_name) / 100.0
+    return p_sc * 12.0 + (1 - p_sc) * 22.0
+
+
+class LapTimeTable:
+    # Expected (deterministic) part of the physics for one (team, track, rain, laps),
+    # built once with NumPy. stint_prefix[c, start, n] is the expected time of the first
+    # n laps of a stint on compound c that starts on lap `start` (0-indexed), so any
+    # strategy scores in O(stints).
+    def __init__(self, team, track, rain_prob=0, total_laps=None, season=None):
+        total_laps = race_laps(track, season, total_laps)
+        self.team = team
+        self.track = track
+        self.season = season
+        self.rain_prob = rain_prob
+        self.total_laps = total_laps
+        self.compounds = COMPOUNDS
+
+        car = RaceCar(team, track, rain_prob, season=season)
+        self.lap_costs = expected_lap_costs(car, total_laps, self.compounds)
+        self.pit_loss = expected_pit_loss(car)
+
+        # Walk the (lap, age) diagonal of every stint start
+        starts = np.arange(total_laps)[:, None]
+        ages = np.arange(total_laps)[None, :]
+        laps = starts + ages
+        valid = laps < total_laps
+        laps = np.minimum(laps, total_laps - 1)
+
+        self.stint_prefix = np.zeros((len(self.compounds), total_laps + 1, total_laps + 1))
+        for c in range(len(self.compounds)):
+            diag = np.where(valid, self.lap_costs[laps, c, ages], 0.0)
+            self.stint_prefix[c, :total_laps, 1:] = np.cumsum(diag, axis=1)
+
+    def stint_time(self, compound, start, length):
+        return self.stint_prefix[COMPOUND_CODE[compound], start, length]
+
+    def score(self, strategy):
+        # Expected race time in seconds
+        stops, tires = normalize_strategy(strategy)
+
+        boundaries = [0]
+        for lap in sorted(set(stops)):
+            if 1 <= lap <= self.total_laps and len(boundaries) < len(tires):
+                boundaries.append(lap - 1)
+        boundaries.append(self.total_laps)
+
+        total = self.pit_loss * (len(boundaries) - 2)
+        for i, tire in enumerate(tires[:len(boundaries) - 1]):
+            total += self.stint_time(tire, boundaries[i], boundaries[i + 1] - boundaries[i])
+        return float(total)
+
+    def score_many(self, strategies):
+        return np.array([self.score(s) for s in strategies])
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_lap_table(team, track, rain_prob=0, total_laps=None, season=None):
+    # Process-level cache; rebuilt when the parameter store reloads the databases
+    params = get_car_params(team, track, season)
+    total_laps = race_laps(track, season, total_laps)
+    key = (season, team, track, rain_prob, total_laps)
+    with _tables_lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] is params:
+            return cached[1]
+
+    table = LapTimeTable(team, track, rain_prob, total_laps, season)
+    with _tables_lock:
+        _tables[key] = (params, table)
+    return table
@@ -0,0 +1,220 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+from src.simulation import RaceCar
+from src.engine import PIT_LOSS, SC_PIT_LOSS
+from src.lap_table import expected_lap_costs, expected_pit_loss, rain_probabilities
+from src.params import race_laps
+from src.planner import DRY_COMPOUNDS
+
+# Pit-wall calls from a mid-race snapshot.
+#   python -m src.live --team Ferrari --track Bahrain --lap 23 --compound MEDIUM --age 12 --sc
+# A backward DP gives the expected time-to-go of every (lap, stops made, compounds used,
+# compound, tyre age) state, so a call is a table lookup plus a forward walk of the plan.
+# The table is kept between calls and only rebuilt when the weather it assumed no longer
+# holds; a rebuild that would blow the latency budget falls back to the previous table.
+# Model limits: SC laps are independent draws (as in RaceCar), so a Safety Car only changes
+# the cost of boxing now (SC_PIT_LOSS instead of PIT_LOSS).
+
+RaceState = namedtuple('RaceState', ['lap', 'compound', 'tyre_age', 'fuel', 'raining', 'safety_car',
+                                     'compounds_used', 'stops'])
+RaceState.__new__.__defaults__ = (False, False, (), 0)
+# lap: laps completed (the call is for the start of lap + 1), tyre_age: laps on the current set,
+# fuel: kg on board, compounds_used: every compound run so far (the current one is added),
+# stops: pit stops made so far
+
+PitCall = namedtuple('PitCall', ['box', 'compound', 'plan', 'expected_remaining', 'elapsed_ms', 'source'])
+# box / compound: the call for the coming lap; plan: (remaining stop laps, tyres from the current set on);
+# expected_remaining: seconds to the flag; source: 'lookup' (table reused), 'rebuilt' or 'stale'
+
+DEFAULT_BUDGET_MS = 50.0
+INTER = 'INTER'
+
+
+class CostToGo:
+    # value[j - start][k, mask, c, age]: expected seconds from the start of lap j to the flag
+    def __init__(self, lap_costs, pit_loss, compounds, max_stops, start, deadline=None):
+        self.lap_costs = lap_costs
+        self.pit_loss = pit_loss
+        self.compounds = compounds
+        self.start = start
+        self.complete = True
+
+        n_laps, n_comp, n_ages = lap_costs.shape
+        n_masks = 1 << n_comp
+        masks = np.arange(n_masks)
+        self.new_mask = masks[:, None] | (1 << np.arange(n_comp))[None, :]  # [mask, c] after fitting c
+
+        # Two-compound rule at the flag, as in StrategyPlanner
+        legal = np.array([bin(m).count('1') >= 2 for m in masks])
+
+        value = np.broadcast_to(np.where(legal, 0.0, np.inf)[None, :, None, None],
+                                (max_stops + 1, n_masks, n_comp, n_ages)).copy()
+        values = [value]
+        for j in range(n_laps - 1, start - 1, -1):
+            if deadline is not None and time.perf_counter() > deadline:
+                self.complete = False
+                break
+            value = self.step(j, value, pit_loss)
+            values.append(value)
+        self.values = values[::-1]  # values[j - start], plus the finish
+
+    def step(self, j, after, pit_loss):
+        # Value at the start of lap j from the value at the start of lap j + 1
+        costs = self.lap_costs[j]
+        aged = np.concatenate([after[..., 1:], after[..., -1:]], axis=-1)  # age + 1, capped
+        stay = costs[None, None] + aged
+        box = self.box_values(j, after) + pit_loss
+        return np.minimum(stay, box[:, :, None, None])
+
+    def box_values(self, j, after):
+        # [k, mask]: best value of boxing onto a fresh set at the start of lap j (pit loss excluded)
+        n_comp = len(self.compounds)
+        fresh = self.lap_costs[j, :, 0][None, None, :] + after[1:, self.new_mask, np.arange(n_comp), 1]
+        box = np.full(after.shape[:2], np.inf)
+        box[:-1] = fresh.min(axis=2) if j > 0 else np.inf  # no stop before lap 2
+        return box
+
+    def after(self, j):
+        return self.values[j + 1 - self.start]
+
+    def decide(self, j, k, mask, c, age, pit_loss):
+        # (box?, compound, expected time to go) at the start of lap j
+        after = self.after(j)
+        age = min(age, self.lap_costs.shape[2] - 1)
+        stay = self.lap_costs[j, c, age] + after[k, mask, c, min(age + 1, self.lap_costs.shape[2] - 1)]
+        if k + 1 < after.shape[0] and j > 0:
+            fresh = self.lap_costs[j, :, 0] + after[k + 1, self.new_mask[mask], np.arange(len(self.compounds)), 1]
+            best = int(fresh.argmin())
+            if fresh[best] + pit_loss < stay:
+                return True, best, float(fresh[best] + pit_loss)
+        return False, c, float(stay)
+
+    def plan(self, j, k, mask, c, age, first_pit_loss):
+        # Walk the optimal decisions from lap j to the flag: (1-indexed stop laps, tyres), time to go
+        stops, tires = [], [self.compounds[c]]
+        box, c_next, total = self.decide(j, k, mask, c, age, first_pit_loss)
+        for lap in range(j, self.lap_costs.shape[0]):
+            if lap > j:
+                box, c_next, _ = self.decide(lap, k, mask, c, age, self.pit_loss)
+            if box:
+                stops.append(lap + 1)
+                tires.append(self.compounds[c_next])
+                k, mask, c, age = k + 1, self.new_mask[mask, c_next], c_next, 0
+            age += 1
+        return (stops, tires), total
+
+
+class LiveStrategist:
+    def __init__(self, team, track, rain_prob=0, total_laps=None, season=None, max_stops=3,
+                 budget_ms=DEFAULT_BUDGET_MS):
+        self.team = team
+        self.track = track
+        self.rain_prob = rain_prob
+        self.season = season
+        self.total_laps = race_laps(track, season, total_laps)
+        self.max_stops = max_stops
+        self.budget_ms = budget_ms
+
+        self.car = RaceCar(team, track, rain_prob, season=season, record_history=False)
+        self.start_fuel = self.car.current_fuel
+        self.pit_loss = expected_pit_loss(self.car)
+        self.table = None
+        self.table_key = None
+        self.last_call = None
+
+        # Pre-race: the dry-start table, so the first call in the race is already a lookup
+        self.table, self.table_key = self.build(0, False, self.compounds_for(False, ()), None)
+
+    def compounds_for(self, raining, used):
+        # Intermediates only enter the search once rain is possible or already happened
+        if raining or self.rain_prob > 0 or INTER in used:
+            return DRY_COMPOUNDS + [INTER]
+        return list(DRY_COMPOUNDS)
+
+    def build(self, start, raining, compounds, deadline):
+        p_rain = rain_probabilities(self.rain_prob, self.total_laps, start, raining)
+        lap_costs = expected_lap_costs(self.car, self.total_laps, compounds, p_rain)
+        table = CostToGo(lap_costs, self.pit_loss, compounds, self.max_stops, start, deadline)
+        return table, (start, raining, tuple(compounds))
+
+    def table_for(self, state, deadline):
+        # Reuse the table while its weather assumptions hold. Without rain in play the dry-start
+        # table is exact for every later lap; with rain in play the chain depends on the lap.
+        compounds = self.compounds_for(state.raining, state.compounds_used)
+        start, raining, table_compounds = self.table_key
+        rain_in_play = self.rain_prob > 0 or state.raining or raining
+        if raining == state.raining and table_compounds == tuple(compounds) and start <= state.lap and \
+                (not rain_in_play or start == state.lap):
+            return self.table, 'lookup'
+
+        table, key = self.build(state.lap, state.raining, compounds, deadline)
+        if not table.complete and self.table_key[2] == tuple(compounds) and start <= state.lap:
+            return self.table, 'stale'  # out of time: the previous table still covers this lap
+        if not table.complete:
+            table, key = self.build(state.lap, state.raining, compounds, None)  # nothing to fall back on
+        self.table, self.table_key = table, key
+        return table, 'rebuilt'
+
+    def recommend(self, state):
+        start_time = time.perf_counter()
+        deadline = start_time + self.budget_ms / 1000.0
+        if not 0 <= state.lap < self.total_laps:
+            raise ValueError(f"Lap {state.lap} is outside a {self.total_laps}-lap race")
+
+        table, source = self.table_for(state, deadline)
+        compounds = table.compounds
+        if state.compound not in compounds:
+            raise ValueError(f"Unknown compound {state.compound} (expected one of {compounds})")
+        c = compounds.index(state.compound)
+        mask = 0
+        for name in set(state.compounds_used) | {state.compound}:
+            if name in compounds:
+                mask |= 1 << compounds.index(name)
+        stops = min(state.stops, self.max_stops)
+
+        # Boxing now costs less if the SC was out on the lap just completed (RaceCar.pit_stop)
+        pit_now = SC_PIT_LOSS if state.safety_car else PIT_LOSS
+        plan, to_go = table.plan(state.lap, stops, mask, c, state.tyre_age, pit_now)
+        # The table assumes the race-start fuel load; fuel is linear, so the difference is a constant
+        to_go += (self.total_laps - state.lap) * (state.fuel - self.start_fuel) * self.car.fuel_penalty
+
+        box = bool(plan[0]) and plan[0][0] == state.lap + 1
+        call = PitCall(box, plan[1][1] if box else state.compound, plan, to_go,
+                       (time.perf_counter() - start_time) * 1000.0, source)
+        self.last_call = (state, call)
+        return call
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Box / stay call from a mid-race snapshot.")
+    parser.add_argument('--team', required=True)
+    parser.add_argument('--track', required=True)
+    parser.add_argument('--rain-prob', type=int, default=0)
+    parser.add_argument('--season', type=int, default=None)
+    parser.add_argument('--lap', type=int, required=True, help="Laps completed")
+    parser.add_argument('--compound', default='MEDIUM')
+    parser.add_argument('--age', type=int, default=0, help="Laps on the current tyres")
+    parser.add_argument('--fuel', type=float, default=None, help="kg on board (default: burned at the base rate)")
+    parser.add_argument('--used', nargs='*', default=[], help="Compounds already run")
+    parser.add_argument('--stops', type=int, default=0)
+    parser.add_argument('--raining', action='store_true')
+    parser.add_argument('--sc', action='store_true', help="Safety Car out on the lap just completed")
+    args = parser.parse_args(argv)
+
+    strategist = LiveStrategist(args.team, args.track, args.rain_prob, season=args.season)
+    fuel = args.fuel if args.fuel is not None else \
+        strategist.start_fuel - args.lap * strategist.car.base_burn_rate
+    state = RaceState(args.lap, args.compound, args.age, fuel, args.raining, args.sc, tuple(args.used), args.stops)
+    call = strategist.recommend(state)
+    stops, tires = call.plan
+    print(f"{'BOX BOX -> ' + call.compound if call.box else 'STAY OUT'} "
+          f"| plan: stops {stops} tyres {tires} | {call.expected_remaining:.1f}s to go "
+          f"| {call.elapsed_ms:.1f} ms ({call.source})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import math
+import time
+from statistics import NormalDist
+from src.engine import BatchRaceEngine
+from src.simulation import make_rng
+
+
+def wilson_interval(wins, n, z):
+    # Wilson score interval for a win probability (well behaved near 0% / 100%)
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class MonteCarloResult:
+    def __init__(self, n, wins_a, win_ci, mean_delta, delta_ci, elapsed, converged):
+        self.n = n
+        self.wins_a = wins_a
+        self.wins_b = n - wins_a
+        self.win_prob_a = wins_a / n if n else 0.0
+        self.win_ci = win_ci  # (low, high) for P(strategy A beats B)
+        self.mean_delta = mean_delta  # mean(time A - time B), seconds
+        self.delta_ci = delta_ci
+        self.elapsed = elapsed  # seconds spent sampling
+        self.converged = converged  # False if the sample / time budget ran out first
+
+    def __repr__(self):
+        return (f"MonteCarloResult(n={self.n}, win_prob_a={self.win_prob_a:.3f}, "
+                f"win_ci=({self.win_ci[0]:.3f}, {self.win_ci[1]:.3f}), mean_delta={self.mean_delta:.2f}s, "
+                f"elapsed={self.elapsed:.3f}s, converged={self.converged})")
+
+
+def compare_strategies(team, track, rain_prob, strategy_a, strategy_b, total_laps=None, metric='win_prob',
+                       tolerance=0.05, confidence=0.95, min_samples=20, max_samples=20000, time_budget=None,
+                       seed=None, engine=None, season=None, progress=None):
+    # Adaptive Monte Carlo: races A and B in paired batches (common random numbers) until the
+    # confidence interval of the chosen metric is narrower than `tolerance`, the sample cap is
+    # hit or `time_budget` seconds have passed.
+    #   metric='win_prob' -> width of the P(A beats B) interval (tolerance in probability)
+    #   metric='delta'    -> width of the mean time delta interval (tolerance in seconds)
+    # progress(fraction, partial MonteCarloResult) is called after every batch; an exception
+    # raised from it (e.g. a cancelled GUI job) stops the run.
+    if metric not in ('win_prob', 'delta'):
+        raise ValueError(f"Unknown metric: {metric}")
+
+    engine = engine or BatchRaceEngine(team, track, rain_prob, total_laps, season)
+    rng = make_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    start = time.perf_counter()
+    n, wins = 0, 0
+    delta_sum, delta_sq_sum = 0.0, 0.0
+    batch = min_samples
+    converged = False
+
+    while n < max_samples:
+        batch = min(batch, max_samples - n)
+        totals = engine.simulate([strategy_a, strategy_b], n_races=batch, rng=rng,
+                                 common_random_numbers=True).totals_by_strategy()
+        delta = totals[0] - totals[1]
+
+        n += batch
+        wins += int((delta < 0).sum()) + 0.5 * int((delta == 0).sum())  # a dead heat is half a win each
+        delta_sum += float(delta.sum())
+        delta_sq_sum += float((delta * delta).sum())
+
+        win_ci = wilson_interval(wins, n, z)
+        mean_delta = delta_sum / n
+        var = max(0.0, delta_sq_sum / n - mean_delta * mean_delta) * n / max(n - 1, 1)
+        half = z * math.sqrt(var / n)
+        delta_ci = (mean_delta - half, mean_delta + half)
+
+        width = win_ci[1] - win_ci[0] if metric == 'win_prob' else delta_ci[1] - delta_ci[0]
+        elapsed = time.perf_counter() - start
+        if width <= tolerance:
+            converged = True
+            break
+        if time_budget is not None and elapsed >= time_budget:
+            break
+        if progress is not None:
+            # The interval narrows like 1/sqrt(n): (tolerance / width)^2 of the samples are done
+            fraction = max(n / max_samples, (tolerance / width) ** 2 if width > 0 else 1.0,
+                           elapsed / time_budget if time_budget else 0.0)
+            progress(fraction, MonteCarloResult(n, wins, win_ci, mean_delta, delta_ci, elapsed, False))
+
+        # Grow the batch so close calls don't pay the Python loop overhead per few samples
+        batch = min(batch * 2, 5000)
+
+    return MonteCarloResult(n, wins, win_ci, mean_delta, delta_ci, time.perf_counter() - start, converged)
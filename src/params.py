@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import warnings
+import numpy as np
+from collections import namedtuple
+from types import MappingProxyType
+
+# --- PATH FINDING ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+
+DEFAULT_TEAM = 'Red Bull Racing'
+DEFAULT_TEAM_STATS = {'pace_index': 1.0, 'deg_index': 1.0}
+DEFAULT_TRACK_STATS = {'avg_deg': 0.05}
+# Race distance for tracks without a 'laps' entry in track_db.json
+DEFAULT_RACE_LAPS = 57
+
+# team_db.json / track_db.json hold this season; season_db.json holds every profiled season
+DEFAULT_SEASON = 2023
+
+
+def season_db_file(session_type='R'):
+    # Race pace by default; other sessions (e.g. 'Q') are profiled into their own file
+    return 'season_db.json' if session_type == 'R' else f'season_db_{session_type}.json'
+
+# Compound codes shared by the batch engine, lap tables and lap history (index = code)
+COMPOUNDS = ['SOFT', 'MEDIUM', 'HARD', 'INTER']
+COMPOUND_CODE = MappingProxyType({name: i for i, name in enumerate(COMPOUNDS)})
+
+TIRE_PACE_OFFSETS = MappingProxyType({
+    'SOFT': 0.0, 'MEDIUM': 0.5, 'HARD': 1.0, 'INTER': 5.0
+})
+
+# --- TYRE CURVES ---
+# Fallback when a (track, compound) has no fitted curve in tyre_db.json (src/tyre_model.py):
+# deg = track avg_deg x multiplier, cliff = CLIFF_BASE * exp(rate * (age - onset)) past the onset.
+DEFAULT_DEG_MULTIPLIERS = {'SOFT': 1.0, 'MEDIUM': 0.7, 'HARD': 0.4}
+DEFAULT_CLIFFS = {'SOFT': (18, 0.3), 'MEDIUM': (28, 0.3), 'HARD': (None, 0.0), 'INTER': (None, 0.0)}
+INTER_DEG = 0.02
+CLIFF_BASE = 0.1
+TYRE_AGE_LIMIT = 100  # cliff tables cover ages 0..TYRE_AGE_LIMIT, older tyres are clamped
+
+# Everything RaceCar needs from the databases, precomputed and read-only.
+# cliff_table[compound code, tyre age] is the cliff penalty in seconds.
+CarParams = namedtuple('CarParams', ['team_stats', 'track_stats', 'base_lap_time', 'tire_deg_coeffs',
+                                     'tyre_curves', 'cliff_table'])
+
+
+def cliff_curve(onset, rate):
+    ages = np.arange(TYRE_AGE_LIMIT + 1)
+    if onset is None:
+        return np.zeros(len(ages))
+    return np.where(ages > onset, CLIFF_BASE * np.exp(rate * (ages - onset)), 0.0)
+
+
+def build_car_params(team_stats, track_stats, tyre_curves=None):
+    base_deg = track_stats['avg_deg']
+    team_factor = team_stats['deg_index']
+    tyre_curves = tyre_curves or {}
+
+    tire_deg_coeffs = {}
+    curves = {}
+    for compound in COMPOUNDS:
+        fitted = tyre_curves.get(compound)
+        if fitted is not None:
+            deg, onset, rate = fitted['deg'], fitted['cliff_onset'], fitted['cliff_rate']
+        else:
+            deg = base_deg * DEFAULT_DEG_MULTIPLIERS.get(compound, 0.0)
+            onset, rate = DEFAULT_CLIFFS[compound]
+        tire_deg_coeffs[compound] = INTER_DEG if compound == 'INTER' else deg * team_factor
+        curves[compound] = MappingProxyType({'cliff_onset': onset, 'cliff_rate': rate})
+
+    cliff_table = np.stack([cliff_curve(curves[c]['cliff_onset'], curves[c]['cliff_rate']) for c in COMPOUNDS])
+    cliff_table.flags.writeable = False
+
+    return CarParams(
+        team_stats=MappingProxyType(dict(team_stats)),
+        track_stats=MappingProxyType(dict(track_stats)),
+        base_lap_time=90.0 * team_stats['pace_index'],
+        tire_deg_coeffs=MappingProxyType(tire_deg_coeffs),
+        tyre_curves=MappingProxyType(curves),
+        cliff_table=cliff_table
+    )
+
+
+class ParameterStore:
+    # Lazily loads team_db.json / track_db.json / season_db.json / tyre_db.json once per process.
+    # A file is re-read only when its mtime changes.
+    #   season=None -> the flat default-season databases (team_db.json / track_db.json)
+    #   season=2024 -> season_db.json, indexed by (season, team) and (season, track)
+    def __init__(self, data_dir=DATA_DIR, session_type='R'):
+        self.team_db_path = os.path.join(data_dir, 'team_db.json')
+        self.track_db_path = os.path.join(data_dir, 'track_db.json')
+        self.season_db_path = os.path.join(data_dir, season_db_file(session_type))
+        self.tyre_db_path = os.path.join(data_dir, 'tyre_db.json')
+        self._lock = threading.Lock()
+        self._files = {}  # path -> (mtime, parsed json)
+        self._params = {}  # (season, team, track) -> CarParams
+        self._team_index = {}  # (season, team) -> stats
+        self._track_index = {}  # (season, track) -> stats
+        self._tyre_index = {}  # (season, track) -> {compound: curve}
+        self._seasons = ()
+
+    def _read(self, path, optional=False):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            if optional:
+                return {}, self._files.pop(path, None) is not None
+            raise FileNotFoundError(f"Database not found at {path}")
+
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], False
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+        self._files[path] = (mtime, data)
+        return data, True
+
+    def _refresh(self):
+        team_db, team_changed = self._read(self.team_db_path)
+        track_db, track_changed = self._read(self.track_db_path)
+        season_db, season_changed = self._read(self.season_db_path, optional=True)
+        tyre_db, tyre_changed = self._read(self.tyre_db_path, optional=True)
+        if season_changed:
+            self._index(season_db)
+        if tyre_changed:
+            self._tyre_index = {(int(season), track): curves
+                                for season, tracks in tyre_db.items() for track, curves in tracks.items()}
+        if team_changed or track_changed or season_changed or tyre_changed:
+            self._params.clear()
+        return team_db, track_db
+
+    def _index(self, season_db):
+        # Flattens {"2024": {"teams": {...}, "tracks": {...}}} into tuple-keyed dicts
+        self._team_index = {(int(season), team): stats
+                            for season, db in season_db.items() for team, stats in db['teams'].items()}
+        self._track_index = {(int(season), track): stats
+                             for season, db in season_db.items() for track, stats in db['tracks'].items()}
+        self._seasons = tuple(sorted(int(season) for season in season_db))
+
+    def team_db(self, season=None):
+        with self._lock:
+            team_db = self._refresh()[0]
+            if season is None:
+                return MappingProxyType(team_db)
+            return MappingProxyType({team: stats for (s, team), stats in self._team_index.items() if s == season})
+
+    def track_db(self, season=None):
+        with self._lock:
+            track_db = self._refresh()[1]
+            if season is None:
+                return MappingProxyType(track_db)
+            return MappingProxyType({track: stats for (s, track), stats in self._track_index.items() if s == season})
+
+    def seasons(self):
+        with self._lock:
+            self._refresh()
+            return self._seasons
+
+    def version(self):
+        # Changes whenever any database file is rewritten
+        with self._lock:
+            self._refresh()
+            return tuple(sorted((path, mtime) for path, (mtime, _) in self._files.items()))
+
+    def _season_stats(self, team_name, track_name, season, track_db):
+        if season not in self._seasons:
+            raise KeyError(f"No parameters for season {season} (profiled: {list(self._seasons)})")
+
+        team_stats = self._team_index.get((season, team_name))
+        if team_stats is None:
+            teams = sorted(team for s, team in self._team_index if s == season)
+            raise KeyError(f"Unknown team {team_name!r} in {season} (known: {teams})")
+
+        # A track not raced (or not profiled) that season borrows its most recent earlier profile
+        for s in sorted((s for s in self._seasons if s <= season), reverse=True):
+            if (s, track_name) in self._track_index:
+                return team_stats, self._track_index[(s, track_name)]
+        return team_stats, track_db.get(track_name, DEFAULT_TRACK_STATS)
+
+    def _tyre_curves(self, track_name, season):
+        # Fitted curves of the season, else of the most recent earlier season with that track
+        season = DEFAULT_SEASON if season is None else season
+        fitted = sorted((s for s, track in self._tyre_index if track == track_name and s <= season), reverse=True)
+        return self._tyre_index[(fitted[0], track_name)] if fitted else None
+
+    def race_laps(self, track_name, season=None):
+        # Scheduled race distance from track_db 'laps' (same season fallback as the track stats)
+        with self._lock:
+            track_db = self._refresh()[1]
+            stats = track_db.get(track_name, {})
+            if season is not None:
+                earlier = sorted((s for s, track in self._track_index if track == track_name and s <= season),
+                                 reverse=True)
+                if earlier:
+                    stats = self._track_index[(earlier[0], track_name)]
+            return int(stats.get('laps', DEFAULT_RACE_LAPS))
+
+    def get(self, team_name, track_name, season=None):
+        with self._lock:
+            team_db, track_db = self._refresh()
+
+            key = (season, team_name, track_name)
+            params = self._params.get(key)
+            if params is None:
+                if season is not None:
+                    team_stats, track_stats = self._season_stats(team_name, track_name, season, track_db)
+                else:
+                    # Unknown teams fall back to Red Bull stats
+                    if team_name in team_db:
+                        team_stats = team_db[team_name]
+                    else:
+                        warnings.warn(f"Unknown team {team_name!r}, using {DEFAULT_TEAM} stats")
+                        team_stats = team_db.get(DEFAULT_TEAM, DEFAULT_TEAM_STATS)
+                    track_stats = track_db.get(track_name, DEFAULT_TRACK_STATS)
+                params = build_car_params(team_stats, track_stats, self._tyre_curves(track_name, season))
+                self._params[key] = params
+
+            return params
+
+
+# Shared by every RaceCar / optimizer in this process
+PARAMS = ParameterStore()
+
+
+def get_car_params(team_name, track_name, season=None):
+    return PARAMS.get(team_name, track_name, season)
+
+
+def race_laps(track_name, season=None, total_laps=None):
+    # total_laps wins when given; otherwise the track's race distance
+    return total_laps if total_laps is not None else PARAMS.race_laps(track_name, season)
@@ -0,0 +1,99 @@
+import numpy as np
+from src.engine import COMPOUND_CODE
+from src.lap_table import get_lap_table
+from src.params import race_laps
+
+DRY_COMPOUNDS = ['SOFT', 'MEDIUM', 'HARD']
+
+
+class StrategyPlanner:
+    # Dynamic programming over (lap, stops, compounds used, compound, tyre age).
+    # One forward pass gives the best expected strategy for every stop count up to max_stops.
+    def __init__(self, team, track, rain_prob=0, total_laps=None, compounds=None, season=None):
+        self.team = team
+        self.track = track
+        self.season = season
+        self.rain_prob = rain_prob
+        self.total_laps = race_laps(track, season, total_laps)
+        self.compounds = list(compounds or DRY_COMPOUNDS)
+
+        table = get_lap_table(team, track, rain_prob, self.total_laps, season)
+        self.lap_costs = table.lap_costs[:, [COMPOUND_CODE[c] for c in self.compounds], :]
+        self.pit_loss = table.pit_loss
+
+    def solve(self, max_stops=3):
+        n_laps = self.total_laps
+        n_comp = len(self.compounds)
+        n_masks = 1 << n_comp
+        n_ages = n_laps + 1
+
+        # value[k, mask, c, age] = best expected time so far
+        value = np.full((max_stops + 1, n_masks, n_comp, n_ages), np.inf)
+        for c in range(n_comp):
+            value[0, 1 << c, c, 0] = 0.0
+
+        # pit_from[lap][k, mask, c] = (previous mask, previous flat (c, age) index)
+        pit_from = []
+
+        for lap in range(n_laps):
+            costs = self.lap_costs[lap]
+            new = np.full_like(value, np.inf)
+
+            # A. Stay out: age + 1
+            new[..., 1:] = value[..., :-1] + costs[None, None, :, :-1]
+
+            # B. Box at the start of this lap (no stop before lap 2)
+            came_from = np.full((max_stops + 1, n_masks, n_comp, 2), -1, dtype=np.int32)
+            if lap > 0:
+                flat = value.reshape(max_stops + 1, n_masks, -1)
+                best_idx = flat.argmin(axis=2)
+                best = np.take_along_axis(flat, best_idx[..., None], axis=2)[..., 0]
+
+                for k in range(max_stops):
+                    for mask in range(n_masks):
+                        if not np.isfinite(best[k, mask]):
+                            continue
+                        for c in range(n_comp):
+                            new_mask = mask | (1 << c)
+                            cand = best[k, mask] + self.pit_loss + costs[c, 0]
+                            if cand < new[k + 1, new_mask, c, 1]:
+                                new[k + 1, new_mask, c, 1] = cand
+                                came_from[k + 1, new_mask, c] = (mask, best_idx[k, mask])
+
+            pit_from.append(came_from)
+            value = new
+
+        # --- TWO-COMPOUND RULE ---
+        results = {}
+        for k in range(max_stops + 1):
+            best_time, best_state = np.inf, None
+            for mask in range(n_masks):
+                if bin(mask).count('1') < 2:
+                    continue
+                flat_idx = int(value[k, mask].argmin())
+                if value[k, mask].flat[flat_idx] < best_time:
+                    best_time = float(value[k, mask].flat[flat_idx])
+                    best_state = (k, mask) + divmod(flat_idx, n_ages)
+
+            if best_state is not None:
+                results[k] = (best_time / 60.0, self.backtrack(best_state, pit_from))
+
+        return results
+
+    def backtrack(self, state, pit_from):
+        k, mask, c, age = state
+        lap = self.total_laps - 1
+        stops, tires = [], []
+
+        while True:
+            stint_start = lap - age + 1
+            tires.append(self.compounds[c])
+            if stint_start == 0:
+                break
+            stops.append(stint_start + 1)  # stop lap is 1-indexed
+            prev_mask, prev_idx = pit_from[stint_start][k, mask, c]
+            prev_c, prev_age = divmod(int(prev_idx), self.total_laps + 1)
+            k, mask, c, age = k - 1, int(prev_mask), prev_c, prev_age
+            lap = stint_start - 1
+
+        return stops[::-1], tires[::-1]
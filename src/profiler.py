@@ -1,97 +1,197 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
 import json
-from sklearn.linear_model import LinearRegression
-
-DATA_DIR = '../data/season_2023'
-
-
-def profile_season():
-    print("--- STARTING SEASON PROFILING ---")
-
-    # 1. Initialize Databases
-    track_db = {}
-    team_stats = {}  # { 'Red Bull': {'pace_deficits': [], 'deg_factors': []} }
-
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]
-
-    for file in files:
-        gp_name = file.replace('_Clean.csv', '')
-        print(f"Analyzing {gp_name}...")
-
+from src.params import DATA_DIR, DEFAULT_SEASON, season_db_file
+from src.lap_store import STORE_DIR, file_hash, has_season, load_laps, select_partitions, season_csv_dir, \
+    sync_season
+
+OUT_DIR = DATA_DIR
+# Stand-alone exports such as processed/2024_Bahrain_Clean.csv (<year>_<gp>_Clean.csv)
+PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
+
+# Only these columns are read from the columnar store
+PROFILE_COLUMNS = ['Driver', 'Team', 'LapNumber', 'TyreLife', 'LapTimeSec']
+
+# Driver -> team, for exports without a Team column
+SEASON_LINEUPS = {
+    2024: {
+        'VER': 'Red Bull Racing', 'PER': 'Red Bull Racing',
+        'LEC': 'Ferrari', 'SAI': 'Ferrari', 'BEA': 'Ferrari',
+        'HAM': 'Mercedes', 'RUS': 'Mercedes',
+        'NOR': 'McLaren', 'PIA': 'McLaren',
+        'ALO': 'Aston Martin', 'STR': 'Aston Martin',
+        'GAS': 'Alpine', 'OCO': 'Alpine', 'DOO': 'Alpine',
+        'ALB': 'Williams', 'SAR': 'Williams', 'COL': 'Williams',
+        'RIC': 'RB', 'TSU': 'RB', 'LAW': 'RB',
+        'BOT': 'Kick Sauber', 'ZHO': 'Kick Sauber',
+        'HUL': 'Haas F1 Team', 'MAG': 'Haas F1 Team',
+    },
+}
+
+# We assume Fuel Correction = 0.05s/lap generic
+FUEL_CORRECTION_PER_LAP = 0.05
+DEFAULT_TRACK_DEG = 0.045
+
+# Per-race sufficient statistics (regression sums, medians, counts) keyed by source file hash
+MANIFEST_FILE = 'profile_manifest.json'
+
+
+def race_sources(year, data_dir, store_dir, session_type='R'):
+    # {gp: source file} for the season; the file hash decides whether a race is re-profiled.
+    # A store-backed season first ingests race CSVs that are new or changed in data_dir.
+    if session_type == 'R' and store_dir and has_season(year, store_dir):
+        sync_season(year, data_dir, store_dir)
+        return {p['gp']: os.path.join(store_dir, p['path']) for p in select_partitions([year], store_dir=store_dir)}
+
+    sources = {}
+    if os.path.isdir(data_dir):
+        sources = {f.replace('_Clean.csv', ''): os.path.join(data_dir, f)
+                   for f in sorted(os.listdir(data_dir)) if f.endswith('.csv')}
+
+    # Races only exported to data/processed (e.g. 2024_Bahrain_Clean.csv)
+    prefix = f'{year}_'
+    if session_type == 'R' and os.path.isdir(PROCESSED_DIR):
+        for f in sorted(os.listdir(PROCESSED_DIR)):
+            if f.startswith(prefix) and f.endswith('_Clean.csv'):
+                sources.setdefault(f[len(prefix):-len('_Clean.csv')], os.path.join(PROCESSED_DIR, f))
+    return sources
+
+
+def race_key(year, session_type, gp):
+    return f'{year}/{session_type}/{gp}'
+
+
+def attach_teams(df, year):
+    # Exports without a Team column get it from the season's driver lineup
+    if 'Team' in df.columns and df['Team'].notna().all():
+        return df
+    lineup = SEASON_LINEUPS.get(year, {})
+    unknown = sorted(set(df['Driver']) - set(lineup))
+    if unknown:
+        print(f"[WARNING] No {year} team for drivers {unknown}, their laps are skipped")
+    df = df.assign(Team=df['Driver'].map(lineup))
+    return df[df['Team'].notna()]
+
+
+def load_season_frame(year, data_dir, store_dir, gps=None, session_type='R'):
+    # One frame for the selected races of the season, with a GP column.
+    # Prefer the columnar store (src/lap_store.py), fall back to the raw CSVs.
+    if session_type == 'R' and store_dir and has_season(year, store_dir):
+        sync_season(year, data_dir, store_dir)
+        df = load_laps(years=[year], gps=gps, columns=PROFILE_COLUMNS, store_dir=store_dir)
+        # Regressions / medians run in float64, like the CSV path
+        df['LapTimeSec'] = df['LapTimeSec'].astype('float64')
+        return df
+
+    frames = []
+    for gp_name, path in race_sources(year, data_dir, None, session_type).items():
+        if gps is not None and gp_name not in gps:
+            continue
         try:
-            df = pd.read_csv(os.path.join(DATA_DIR, file))
+            df = pd.read_csv(path, usecols=lambda c: c in PROFILE_COLUMNS)
         except Exception as e:
             print(f"Skipping {gp_name} (Read Error)")
             continue
+        df = attach_teams(df, year)
+        df['GP'] = gp_name
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=PROFILE_COLUMNS + ['GP'])
+
+    df = pd.concat(frames, ignore_index=True)
+    df['GP'] = df['GP'].astype('category')
+    df['Team'] = df['Team'].astype('category')
+    return df
+
+
+def grouped_sums(df, keys, x='TyreLife', y='FuelCorrectedTime'):
+    # Sufficient statistics for a least-squares fit of y on x per group
+    sums = df.assign(_xx=df[x] * df[x], _xy=df[x] * df[y]) \
+        .groupby(keys, observed=True)[[x, y, '_xx', '_xy']].sum()
+    sums.columns = ['sx', 'sy', 'sxx', 'sxy']
+    sums['n'] = df.groupby(keys, observed=True)[x].count()
+    return sums
+
+
+def slope(s):
+    # Closed-form least-squares slope: cov(x, y) / var(x).
+    # Same coefficient LinearRegression gives, without one model object per group.
+    n = s['n']
+    if n == 0:
+        return 0.0
+    var = s['sxx'] - s['sx'] * s['sx'] / n
+    cov = s['sxy'] - s['sx'] * s['sy'] / n
+    return cov / var if var > 0 else 0.0
+
+
+def race_statistics(df):
+    # Per-race sufficient statistics: {gp: {'laps', 'track': sums, 'teams': {team: sums + median}}}
+    # --- FIX: SANITIZE DATA IMMEDIATELY ---
+    # Remove any rows where TyreLife or LapTimeSec is missing (NaN)
+    df = df.dropna(subset=['TyreLife', 'LapTimeSec'])
+
+    # --- Physics Correction ---
+    df = df.assign(FuelCorrectedTime=df['LapTimeSec'] + (df['LapNumber'] * FUEL_CORRECTION_PER_LAP))
+
+    # Track fit uses the "linear" phase only (TyreLife < 30)
+    track_sums = grouped_sums(df[df['TyreLife'] < 30], 'GP')
+    laps = df.groupby('GP', observed=True)['LapNumber'].max()
+
+    team_sums = grouped_sums(df, ['GP', 'Team'])
+    team_sums['median'] = df.groupby(['GP', 'Team'], observed=True)['LapTimeSec'].median()
+
+    stats = {}
+    for gp in laps.index:
+        track = track_sums.loc[gp].to_dict() if gp in track_sums.index else \
+            {'sx': 0.0, 'sy': 0.0, 'sxx': 0.0, 'sxy': 0.0, 'n': 0}
+        teams = team_sums.xs(gp, level='GP')
+        stats[str(gp)] = {
+            'laps': int(laps[gp]),
+            'track': {k: float(v) for k, v in track.items()},
+            'teams': {str(team): {k: float(v) for k, v in row.items()} for team, row in teams.iterrows()}
+        }
+    return stats
 
-        # --- FIX: SANITIZE DATA IMMEDIATELY ---
-        # Remove any rows where TyreLife or LapTimeSec is missing (NaN)
-        df = df.dropna(subset=['TyreLife', 'LapTimeSec'])
 
-        # --- Physics Correction ---
-        # We assume Fuel Correction = 0.05s/lap generic
-        df['FuelCorrectedTime'] = df['LapTimeSec'] + (df['LapNumber'] * 0.05)
+def aggregate_statistics(stats):
+    # Rebuilds track_db and the team indices from cached per-race statistics
+    track_db = {}
+    team_stats = {}  # { 'Red Bull': {'pace_deficits': [], 'deg_factors': []} }
 
+    for gp, race in stats.items():
         # --- A. TRACK PROFILING ---
-        # We want the "Average Degradation" of this track (across all cars)
-        # We filter for 'clean' racing laps (no pit out/in)
-
-        # Determine Track Baseline
-        track_deg = 0.045  # Default fallback
-        valid_laps = df[df['TyreLife'] < 30]  # focus on the "linear" phase
+        # Needs > 100 laps, otherwise the default fallback is used. Ensure positive and non-zero.
+        track_deg = DEFAULT_TRACK_DEG
+        if race['track']['n'] > 100:
+            track_deg = max(0.01, slope(race['track']))
 
-        if len(valid_laps) > 100:
-            X = valid_laps[['TyreLife']].values
-            y = valid_laps['FuelCorrectedTime'].values
-
-            # Sanity Check for NaNs again just in case
-            if not np.isnan(X).any() and not np.isnan(y).any():
-                reg = LinearRegression().fit(X, y)
-                track_deg = max(0.01, float(reg.coef_[0]))  # Ensure positive and non-zero
-
-        track_db[gp_name] = {
+        track_db[gp] = {
             'avg_deg': track_deg,
-            'laps': int(df['LapNumber'].max())
+            'laps': race['laps']
         }
 
         # --- B. TEAM PROFILING ---
         # 1. Who was the fastest team this race? (Baseline)
-        team_medians = df.groupby('Team')['LapTimeSec'].median()
-        if team_medians.empty: continue
-
-        fastest_time = team_medians.min()
-
-        teams = df['Team'].unique()
-        for team in teams:
-            team_laps = df[df['Team'] == team]
-
-            # Clean team data specifically
-            team_laps = team_laps.dropna(subset=['TyreLife', 'FuelCorrectedTime'])
+        if not race['teams']:
+            continue
+        fastest_time = min(t['median'] for t in race['teams'].values())
 
-            if len(team_laps) < 10: continue
+        for team, t in race['teams'].items():
+            if t['n'] < 10:
+                continue
 
             # Pace Metric: How much slower than the winner? (1.00 = Equal, 1.01 = 1% slower)
-            my_median = team_laps['LapTimeSec'].median()
-            pace_deficit = my_median / fastest_time
+            pace_deficit = t['median'] / fastest_time
 
             # Deg Metric: Does this team degrade faster than the Track Average?
-            my_deg = track_deg  # Default to average
-
-            if len(team_laps) > 20:
-                X_team = team_laps[['TyreLife']].values
-                y_team = team_laps['FuelCorrectedTime'].values
-
-                if not np.isnan(X_team).any():
-                    reg_team = LinearRegression().fit(X_team, y_team)
-                    my_deg = float(reg_team.coef_[0])
+            my_deg = slope(t) if t['n'] > 20 else track_deg
 
             # Deg Factor: 1.0 = Average, 1.2 = High Wear
-            deg_factor = my_deg / track_deg
-
             # Cap extreme outliers (sometimes bad data makes deg factor 5.0 or -2.0)
-            deg_factor = max(0.5, min(2.0, deg_factor))
+            deg_factor = max(0.5, min(2.0, my_deg / track_deg))
 
             if team not in team_stats:
                 team_stats[team] = {'pace_deficits': [], 'deg_factors': []}
@@ -100,28 +200,106 @@ def profile_season():
             team_stats[team]['deg_factors'].append(deg_factor)
 
     # --- C. AGGREGATE RESULTS ---
-    print("\n--- TEAM PERFORMANCE INDEX (2023) ---")
-    final_team_db = {}
+    team_index = {team: (float(np.mean(s['pace_deficits'])), float(np.mean(s['deg_factors'])))
+                  for team, s in team_stats.items()}
+    return track_db, team_index
+
+
+def read_manifest(path):
+    if not os.path.exists(path):
+        return {'races': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def write_season_db(year, track_db, team_db, out_dir, session_type='R'):
+    # Merges one season into season_db.json ({"<year>": {"teams": ..., "tracks": ...}})
+    path = os.path.join(out_dir, season_db_file(session_type))
+    season_db = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            season_db = json.load(f)
+    season_db[str(year)] = {'teams': team_db, 'tracks': track_db}
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(sorted(season_db.items())), f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def profile_season(data_dir=None, out_dir=OUT_DIR, year=DEFAULT_SEASON, store_dir=STORE_DIR, incremental=True,
+                   session_type='R'):
+    print(f"--- STARTING SEASON PROFILING ({year} {session_type}) ---")
+    data_dir = data_dir or season_csv_dir(year, session_type)
 
-    for team, stats in team_stats.items():
-        avg_pace = np.mean(stats['pace_deficits'])
-        avg_deg = np.mean(stats['deg_factors'])
+    # 1. Work out which races are new or changed since the last run
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    manifest = read_manifest(manifest_path) if incremental else {'races': {}}
 
+    sources = race_sources(year, data_dir, store_dir, session_type)
+    hashes = {gp: file_hash(path) for gp, path in sources.items()}
+    races = {key: r for key, r in manifest['races'].items()
+             if (r['year'], r['session']) != (year, session_type) or r['gp'] in sources}
+
+    stale = [gp for gp in sources if races.get(race_key(year, session_type, gp), {}).get('hash') != hashes[gp]]
+    print(f"{len(sources) - len(stale)} races cached, profiling {len(stale)}...")
+
+    # 2. Sufficient statistics for the stale races only
+    if stale:
+        df = load_season_frame(year, data_dir, store_dir, gps=stale, session_type=session_type)
+        for gp, stats in race_statistics(df).items():
+            print(f"Analyzing {gp}...")
+            races[race_key(year, session_type, gp)] = dict(year=year, session=session_type, gp=gp,
+                                                           hash=hashes[gp], **stats)
+
+    manifest['races'] = races
+    write_manifest(manifest, manifest_path)
+
+    # 3. Re-aggregate the whole season from the cache
+    season = {r['gp']: r for r in races.values() if (r['year'], r['session']) == (year, session_type)}
+    track_db, team_index = aggregate_statistics(season)
+
+    print(f"\n--- TEAM PERFORMANCE INDEX ({year}) ---")
+    final_team_db = {}
+
+    for team, (avg_pace, avg_deg) in team_index.items():
         final_team_db[team] = {
             'pace_index': round(avg_pace, 4),
             'deg_index': round(avg_deg, 3)
         }
         print(f"{team:<25} | Pace: {avg_pace:.4f} | Deg: {avg_deg:.2f}")
 
-    # Save to JSON
-    with open('../data/track_db.json', 'w') as f:
-        json.dump(track_db, f, indent=4)
+    # Save to JSON: every season goes to season_db.json, the default season also to the flat files
+    write_season_db(year, track_db, final_team_db, out_dir, session_type)
+
+    if year == DEFAULT_SEASON and session_type == 'R':
+        with open(os.path.join(out_dir, 'track_db.json'), 'w') as f:
+            json.dump(track_db, f, indent=4)
+
+        with open(os.path.join(out_dir, 'team_db.json'), 'w') as f:
+            json.dump(final_team_db, f, indent=4)
+
+    print(f"\n[SUCCESS] Databases saved to {out_dir}")
+    return track_db, final_team_db
+
 
-    with open('../data/team_db.json', 'w') as f:
-        json.dump(final_team_db, f, indent=4)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit team / track parameters from lap data.")
+    parser.add_argument('--years', nargs='+', type=int, default=[DEFAULT_SEASON])
+    parser.add_argument('--session', default='R')
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest and re-profile every race")
+    args = parser.parse_args(argv)
 
-    print("\n[SUCCESS] Databases saved to /data/")
+    for year in args.years:
+        profile_season(year=year, incremental=not args.full, session_type=args.session)
 
 
 if __name__ == "__main__":
-    profile_season()
\ No newline at end of file
+    main()
@@ -1,95 +1,87 @@
-import random
-import json
-import os
-import math
+import numpy as np
+from src.params import get_car_params, TIRE_PACE_OFFSETS, COMPOUND_CODE, TYRE_AGE_LIMIT
+from src.history import LapHistory
+
+# BASE TRACK BURN (kg/lap). Tracks not listed use 1.7
+FUEL_MAP = {
+    "Bahrain": 1.7, "Saudi Arabia": 1.75, "Australia": 1.65,
+    "Monaco": 1.35, "Spain": 1.6, "Canada": 1.5,
+    "Monza": 1.9, "Las Vegas": 1.8, "Qatar": 1.75, "Abu Dhabi": 1.7
+}
+
+# Street circuits get a much higher Safety Car chance per lap (%)
+SC_TRACKS = ["Monaco", "Azerbaijan", "Singapore"]
+
+
+def safety_car_chance(track_name):
+    # % chance of a Safety Car on any given lap
+    return 2.0 if track_name in SC_TRACKS else 0.5
+
+
+def make_rng(seed=None, stream=0):
+    # Same (seed, stream) -> same draws. Different streams are independent.
+    # seed=None still gives fresh OS entropy, like the old global random module.
+    # A SeedSequence (e.g. a spawned child) is extended with the stream, not used as entropy.
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.default_rng(np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (stream,)))
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
 
 
 class RaceCar:
-    def __init__(self, team_name, track_name, rain_prob=0):
+    def __init__(self, team_name, track_name, rain_prob=0, rng=None, seed=None, stream=0, record_history=True,
+                 season=None):
         self.team_name = team_name
         self.track_name = track_name
+        self.season = season  # None = default-season databases
         self.rain_prob = rain_prob
         self.is_raining = False
 
-        # --- PATH FINDING ---
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        team_db_path = os.path.join(project_root, 'data', 'team_db.json')
-        track_db_path = os.path.join(project_root, 'data', 'track_db.json')
-
-        # Load Databases
-        try:
-            with open(team_db_path, 'r') as f:
-                team_db = json.load(f)
-            with open(track_db_path, 'r') as f:
-                track_db = json.load(f)
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Database not found at {team_db_path}")
-
-        # Stats Loading
-        if team_name not in team_db:
-            self.team_stats = team_db.get('Red Bull Racing', {'pace_index': 1.0, 'deg_index': 1.0})
-        else:
-            self.team_stats = team_db[team_name]
+        # All randomness (weather, SC, lap variance) comes from this generator
+        self.rng = rng if rng is not None else make_rng(seed, stream)
 
-        self.track_stats = track_db.get(track_name, {'avg_deg': 0.05})
+        # Stats Loading (cached per process, see src/params.py)
+        params = get_car_params(team_name, track_name, season)
+        self.team_stats = params.team_stats
+        self.track_stats = params.track_stats
 
         # --- PHYSICS ENGINE ---
-        self.base_lap_time = 90.0 * self.team_stats['pace_index']
+        self.base_lap_time = params.base_lap_time
         self.current_fuel = 110.0
 
         # BASE TRACK BURN (This is just the starting point)
         # We will modify this dynamically every lap
-        fuel_map = {
-            "Bahrain": 1.7, "Saudi Arabia": 1.75, "Australia": 1.65,
-            "Monaco": 1.35, "Spain": 1.6, "Canada": 1.5,
-            "Monza": 1.9, "Las Vegas": 1.8, "Qatar": 1.75, "Abu Dhabi": 1.7
-        }
-        self.base_burn_rate = fuel_map.get(track_name, 1.7)
+        self.base_burn_rate = FUEL_MAP.get(track_name, 1.7)
 
         self.fuel_penalty = 0.035
 
         # Degradation & Pace
-        base_deg = self.track_stats['avg_deg']
-        team_factor = self.team_stats['deg_index']
-
-        self.tire_deg_coeffs = {
-            'SOFT': base_deg * team_factor,
-            'MEDIUM': (base_deg * 0.7) * team_factor,
-            'HARD': (base_deg * 0.4) * team_factor,
-            'INTER': 0.02
-        }
-
-        self.tire_pace_offsets = {
-            'SOFT': 0.0, 'MEDIUM': 0.5, 'HARD': 1.0, 'INTER': 5.0
-        }
+        self.tire_deg_coeffs = params.tire_deg_coeffs
+        self.cliff_table = params.cliff_table  # [compound code, tyre age] -> seconds
+        self.tire_pace_offsets = TIRE_PACE_OFFSETS
 
         self.current_tire = 'SOFT'
         self.tire_age = 0
         self.laps_completed = 0
         self.total_race_time = 0.0
-        self.history = []
+        self.last_lap_sc = False
 
-    def pit_stop(self, new_compound, reason="Scheduled"):
-        is_sc = False
-        if self.history:
-            is_sc = self.history[-1].get('SC', False)
+        # Column-based lap log (src/history.py). Optimizer runs can skip it entirely.
+        self.history = LapHistory() if record_history else None
 
-        pit_loss = 12.0 if is_sc else 22.0
+    def pit_stop(self, new_compound, reason="Scheduled"):
+        pit_loss = 12.0 if self.last_lap_sc else 22.0
 
         self.current_tire = new_compound
         self.tire_age = 0
         self.total_race_time += pit_loss
 
         if self.history:
-            self.history[-1]['Time'] += pit_loss
-            self.history[-1]['PitStop'] = True
-            self.history[-1]['PitReason'] = reason
+            self.history.add_pit(pit_loss, reason)
 
     def check_weather(self):
         if self.rain_prob == 0: return
 
-        roll = random.uniform(0, 100)
+        roll = self.rng.uniform(0, 100)
         if self.is_raining:
             if roll < 5: self.is_raining = False
         else:
@@ -100,8 +92,8 @@ class RaceCar:
         # 0. Weather & SC Checks
         self.check_weather()
 
-        sc_chance = 2.0 if self.track_name in ["Monaco", "Azerbaijan", "Singapore"] else 0.5
-        is_safety_car = random.uniform(0, 100) < sc_chance
+        sc_chance = safety_car_chance(self.track_name)
+        is_safety_car = self.rng.uniform(0, 100) < sc_chance
 
         # 1. Base Pace
         lap_time = self.base_lap_time
@@ -129,15 +121,12 @@ class RaceCar:
         # 5. Cliff
         cliff_alert = 0.0
         if not is_safety_car:
-            if self.current_tire == 'SOFT' and self.tire_age > 18:
-                cliff_alert = 0.1 * math.exp(0.3 * (self.tire_age - 18))
-            elif self.current_tire == 'MEDIUM' and self.tire_age > 28:
-                cliff_alert = 0.1 * math.exp(0.3 * (self.tire_age - 28))
+            cliff_alert = float(self.cliff_table[COMPOUND_CODE[self.current_tire], min(self.tire_age, TYRE_AGE_LIMIT)])
         lap_time += cliff_alert
 
         # 6. Randomness
         variance = 0.1 * self.team_stats['pace_index']
-        lap_variance = random.uniform(-variance, variance)
+        lap_variance = self.rng.uniform(-variance, variance)
         lap_time += lap_variance
 
         # --- NEW: TRUE DYNAMIC FUEL LOGIC ---
@@ -170,16 +159,10 @@ class RaceCar:
         self.tire_age += 1
         self.laps_completed += 1
         self.total_race_time += lap_time
+        self.last_lap_sc = is_safety_car
 
-        self.history.append({
-            'Lap': self.laps_completed,
-            'Time': lap_time,
-            'Compound': self.current_tire,
-            'TyreAge': self.tire_age,
-            'Rain': self.is_raining,
-            'SC': is_safety_car,
-            'Fuel': self.current_fuel,
-            'Health': int(tire_health)
-        })
+        if self.history is not None:
+            self.history.append(self.laps_completed, lap_time, self.current_tire, self.tire_age,
+                                self.is_raining, is_safety_car, self.current_fuel, int(tire_health))
 
         return lap_time
\ No newline at end of file
@@ -1,16 +1,81 @@
-from src.simulation import RaceCar
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+from src.simulation import RaceCar, make_rng
+from src.engine import BatchRaceEngine
+from src.planner import StrategyPlanner
+from src.lap_table import get_lap_table
+from src.planner import DRY_COMPOUNDS
+from src.params import race_laps
+
+ONE_STOP_COMBOS = [['SOFT', 'HARD'], ['SOFT', 'MEDIUM'], ['MEDIUM', 'HARD']]
+
+TWO_STOP_COMBOS = [
+    ['SOFT', 'HARD', 'SOFT'],
+    ['SOFT', 'MEDIUM', 'SOFT'],
+    ['SOFT', 'HARD', 'MEDIUM']
+]
+
+# Grid pit windows below are tuned for a 57-lap race and stretched to each track's distance
+REFERENCE_LAPS = 57
+
+
+def search_chunk(job):
+    # Runs inside a worker process: score one slice of the candidate space
+    team, track, rain_prob, total_laps, candidates, seed, crn, season = job
+    engine = BatchRaceEngine(team, track, rain_prob, total_laps, season)
+    times = engine.simulate(candidates, seed=seed, common_random_numbers=crn).total_times / 60.0
+    best = int(times.argmin())
+    return float(times[best]), candidates[best]
 
 
 class StrategyOptimizer:
-    def __init__(self, team, track, rain_prob=0, total_laps=57):
+    def __init__(self, team, track, rain_prob=0, total_laps=None, workers=None, executor=None, seed=None,
+                 common_random_numbers=True, search='dp', monte_carlo=False, season=None):
         self.team = team
         self.track = track
+        self.season = season  # None = default-season databases (team_db.json / track_db.json)
         self.rain_prob = rain_prob
-        self.total_laps = total_laps
+        self.total_laps = race_laps(track, season, total_laps)  # None = the track's race distance
+        self.engine = BatchRaceEngine(team, track, rain_prob, self.total_laps, season)
+
+        # search='dp': expected-time dynamic programming (src/planner.py), any number of stops.
+        # search='grid': sampled brute force over fixed pit windows and tyre combos.
+        self.search = search
+        self.planner = None
+        self.plans = {}
+
+        # Grid candidates are scored from the expected lap-time table (prefix sums, O(stints)).
+        # monte_carlo=True samples them with the batch engine instead (noise, SC, rain).
+        self.monte_carlo = monte_carlo
+        self.table = get_lap_table(team, track, rain_prob, self.total_laps, season)
+
+        # --- PARALLEL SEARCH (optional) ---
+        # workers > 1 splits the candidates across a ProcessPoolExecutor.
+        # Pass an existing executor to avoid paying the pool startup on every search.
+        self.workers = workers
+        self.executor = executor
+
+        # --- RANDOM STREAMS ---
+        # With common random numbers every candidate races the same SC / rain realisation,
+        # so the ranking reflects the strategy and not the dice. A seed is pinned per
+        # optimizer if none is given.
+        self.common_random_numbers = common_random_numbers
+        if seed is None and common_random_numbers:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+        self.stream_counter = 0
 
     def evaluate_strategy(self, stop_laps, compounds):
         # --- PASS THE WEATHER DATA HERE ---
-        car = RaceCar(team_name=self.team, track_name=self.track, rain_prob=self.rain_prob)
+        if self.common_random_numbers:
+            rng = make_rng(self.seed)
+        else:
+            self.stream_counter += 1
+            rng = make_rng(self.seed, self.stream_counter)
+        car = RaceCar(team_name=self.team, track_name=self.track, rain_prob=self.rain_prob, rng=rng,
+                      record_history=False, season=self.season)
 
         current_compound_idx = 0
         car.current_tire = compounds[0]
@@ -28,40 +93,168 @@ class StrategyOptimizer:
 
         return car.total_race_time / 60.0  # Return in minutes
 
-    def find_optimal_1_stop(self):
-        # We search a bit less aggressively to keep the GUI responsive (fast)
-        best_time = float('inf')
-        best_strategy = None
-
-        tire_combos = [['SOFT', 'HARD'], ['SOFT', 'MEDIUM'], ['MEDIUM', 'HARD']]
-
-        # Search pit window: Lap 15 to 45
-        for lap in range(15, 45, 2):  # Step 2 to speed it up
-            for combo in tire_combos:
-                time = self.evaluate_strategy([lap], combo)
-                if time < best_time:
-                    best_time = time
-                    best_strategy = (lap, combo)
-
-        return best_time, best_strategy
-
-    def find_optimal_2_stop(self):
-        best_time = float('inf')
-        best_strategy = None
-
-        tire_combos = [
-            ['SOFT', 'HARD', 'SOFT'],
-            ['SOFT', 'MEDIUM', 'SOFT'],
-            ['SOFT', 'HARD', 'MEDIUM']
-        ]
-
-        # Search pit windows (Step 2 to keep GUI fast)
-        for stop1 in range(12, 30, 2):
-            for stop2 in range(stop1 + 15, 52, 2):
-                for combo in tire_combos:
-                    time = self.evaluate_strategy([stop1, stop2], combo)
-                    if time < best_time:
-                        best_time = time
-                        best_strategy = ([stop1, stop2], combo)
-
-        return best_time, best_strategy
\ No newline at end of file
+    def expected_time(self, stop_laps, compounds):
+        return self.table.score((stop_laps, compounds)) / 60.0  # Return in minutes
+
+    def evaluate_strategies(self, strategies):
+        if not self.monte_carlo:
+            return self.table.score_many(strategies) / 60.0
+
+        # Same as evaluate_strategy, but every candidate races in one NumPy batch
+        result = self.engine.simulate(strategies, seed=self.seed,
+                                      common_random_numbers=self.common_random_numbers)
+        return result.total_times / 60.0  # Return in minutes
+
+    def pick_best(self, strategies):
+        n_workers = self.workers or (os.cpu_count() if self.executor is not None else 1)
+        if self.monte_carlo and n_workers > 1 and len(strategies) > n_workers:
+            return self.pick_best_parallel(strategies, n_workers)
+
+        times = self.evaluate_strategies(strategies)
+        best = int(times.argmin())
+        return float(times[best]), strategies[best]
+
+    def pick_best_parallel(self, strategies, n_workers):
+        # One contiguous chunk per worker, each with its own deterministic seed.
+        # Under common random numbers every worker replays the same race instead.
+        chunks = [list(c) for c in np.array_split(np.arange(len(strategies)), n_workers)]
+        if self.common_random_numbers:
+            seeds = [self.seed] * n_workers
+        else:
+            seeds = np.random.SeedSequence(self.seed).spawn(n_workers)
+        jobs = [(self.team, self.track, self.rain_prob, self.total_laps,
+                 [strategies[i] for i in chunk], seed, self.common_random_numbers, self.season)
+                for chunk, seed in zip(chunks, seeds)]
+
+        if self.executor is not None:
+            results = list(self.executor.map(search_chunk, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(search_chunk, jobs))
+
+        # Reduce: first chunk wins ties, same as the serial scan
+        return min(results, key=lambda r: r[0])
+
+    def find_optimal_strategies(self, max_stops=3):
+        # {stops: (expected minutes, (stop_laps, compounds))} from a single DP pass
+        if max_stops not in self.plans:
+            if self.planner is None:
+                self.planner = StrategyPlanner(self.team, self.track, self.rain_prob, self.total_laps,
+                                               season=self.season)
+            self.plans[max_stops] = self.planner.solve(max_stops)
+        return self.plans[max_stops]
+
+    def find_optimal_k_stop(self, k):
+        return self.find_optimal_strategies(max_stops=max(k, 3))[k]
+
+    def scale_lap(self, lap):
+        # Lap of a 57-lap race -> same fraction of this race
+        return int(round(lap * self.total_laps / REFERENCE_LAPS))
+
+    def one_stop_candidates(self, step=2):
+        candidates = []
+
+        # Search pit window: Lap 15 to 45 (of 57)
+        for lap in range(self.scale_lap(15), self.scale_lap(45), step):
+            for combo in ONE_STOP_COMBOS:
+                candidates.append((lap, combo))
+
+        return candidates
+
+    def two_stop_candidates(self, step=2):
+        candidates = []
+
+        # Search pit windows
+        for stop1 in range(self.scale_lap(12), self.scale_lap(30), step):
+            for stop2 in range(stop1 + self.scale_lap(15), self.scale_lap(52), step):
+                for combo in TWO_STOP_COMBOS:
+                    candidates.append(([stop1, stop2], combo))
+
+        return candidates
+
+    def search_size(self, step=2, max_stops=3):
+        # How much work a search does on this track: strategies scored by the grid,
+        # (lap, state) cells visited by the DP
+        n_comp = len(DRY_COMPOUNDS)
+        return {
+            'laps': self.total_laps,
+            'grid_1_stop': len(self.one_stop_candidates(step)),
+            'grid_2_stop': len(self.two_stop_candidates(step)),
+            'dp_states': self.total_laps * (max_stops + 1) * (1 << n_comp) * n_comp * (self.total_laps + 1),
+        }
+
+    def find_optimal_1_stop(self, step=2):
+        if self.search == 'dp':
+            time, (stops, combo) = self.find_optimal_k_stop(1)
+            return time, (stops[0], combo)
+
+        # step=2 keeps the GUI responsive; use step=1 (ideally with workers) for the full grid
+        return self.pick_best(self.one_stop_candidates(step))
+
+    def find_optimal_2_stop(self, step=2):
+        if self.search == 'dp':
+            return self.find_optimal_k_stop(2)
+
+        return self.pick_best(self.two_stop_candidates(step))
+
+    def find_robust_strategy(self, candidates=None, budget=20000, initial_samples=4, eta=2, finalists=3,
+                             confidence=0.95):
+        # Racing / successive halving under the stochastic model.
+        # Every round races all surviving candidates on the same sampled races (CRN), drops the
+        # ones whose mean is worse than the leader's by more than z combined standard errors,
+        # then keeps the best 1/eta while more than `finalists` remain. Whatever is left of the
+        # budget (total simulated races) goes to the contenders.
+        if candidates is None:
+            candidates = self.one_stop_candidates() + self.two_stop_candidates()
+
+        n_cand = len(candidates)
+        # Two races each before any pruning: a single race gives no variance to test against
+        if budget < 2 * n_cand:
+            raise ValueError(f"budget={budget} races can't race each of the {n_cand} candidates twice")
+
+        z = NormalDist().inv_cdf(confidence)
+        rng = make_rng(self.seed, stream=1)
+        sums, sq_sums, counts = np.zeros(n_cand), np.zeros(n_cand), np.zeros(n_cand)
+        active = np.arange(n_cand)
+        used = 0
+        samples = initial_samples
+
+        while len(active) > 0:
+            samples = min(samples, (budget - used) // len(active))
+            if samples < 1 or (len(active) == 1 and used > 0):
+                break
+
+            totals = self.engine.simulate([candidates[i] for i in active], n_races=samples, rng=rng,
+                                          common_random_numbers=True).totals_by_strategy() / 60.0
+            used += totals.size
+            sums[active] += totals.sum(axis=1)
+            sq_sums[active] += (totals * totals).sum(axis=1)
+            counts[active] += samples
+
+            means = sums[active] / counts[active]
+            var = np.maximum(sq_sums[active] / counts[active] - means ** 2, 0.0) * counts[active] / np.maximum(
+                counts[active] - 1, 1)
+            se2 = var / counts[active]
+
+            # A. Drop statistically dominated candidates
+            leader = int(means.argmin())
+            keep = means - means[leader] <= z * np.sqrt(se2 + se2[leader])
+            active, means = active[keep], means[keep]
+
+            # B. Successive halving down to the finalists
+            if len(active) > finalists:
+                n_keep = max(finalists, int(np.ceil(len(active) / eta)))
+                order = np.argsort(means, kind='stable')[:n_keep]
+                active = active[np.sort(order)]
+
+            samples *= eta
+
+        means = sums[active] / counts[active]
+        var = np.maximum(sq_sums[active] / counts[active] - means ** 2, 0.0) * counts[active] / np.maximum(
+            counts[active] - 1, 1)
+        results = [{'strategy': candidates[i], 'mean': float(m), 'var': float(v), 'samples': int(counts[i])}
+                   for i, m, v in zip(active, means, var)]
+        results.sort(key=lambda r: r['mean'])
+
+        # (best mean minutes, best strategy), finalists with mean / variance in minutes
+        return (results[0]['mean'], results[0]['strategy']), results
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from src.params import DATA_DIR, PARAMS, race_laps
+from src.strategy import StrategyOptimizer
+
+# Memoised best 1-stop / 2-stop strategies per scenario, so the GUI modes don't re-run the
+# optimizer for a team / track / rain combination they have already solved.
+# In-memory LRU, optionally written through to data/cache/strategy_cache.json.
+# Entries are keyed by the parameter-db version: rewriting team_db.json / track_db.json
+# (or any other database file) drops them.
+CACHE_PATH = os.path.join(DATA_DIR, 'cache', 'strategy_cache.json')
+DEFAULT_MAX_ENTRIES = 256
+
+OptimalStrategies = namedtuple('OptimalStrategies', ['one_stop', 'two_stop', 'search_size', 'cached'])
+
+
+def seed_policy(search, monte_carlo, seed, common_random_numbers):
+    # Expected-time searches are deterministic; sampled ones only repeat under a fixed seed.
+    # None = not cacheable.
+    if not monte_carlo:
+        return f'{search}/expected'
+    if seed is None:
+        return None
+    return f'{search}/seed={seed}/crn={int(common_random_numbers)}'
+
+
+def encode(time_min, strategy):
+    stops, tires = strategy
+    stops = int(stops) if not isinstance(stops, list) else [int(s) for s in stops]
+    return [float(time_min), stops, list(tires)]
+
+
+def decode(entry):
+    time_min, stops, tires = entry
+    return time_min, (stops, tires)
+
+
+class StrategyCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None, store=PARAMS):
+        self.max_entries = max_entries
+        self.path = path  # None = memory only
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def db_version(self):
+        # Short digest of the parameter files' (path, mtime) pairs
+        return hashlib.sha256(repr(self.store.version()).encode()).hexdigest()[:16]
+
+    def _sync(self, version):
+        # Caller holds the lock. Drops everything computed against an older database.
+        if not self._loaded:
+            self._loaded = True
+            self._entries.update(self._read_disk(version))
+        if version != self._version:
+            self._version = version
+            for key in [k for k in self._entries if not k.startswith(version)]:
+                del self._entries[key]
+
+    def _read_disk(self, version):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}  # unreadable cache file: start over
+        return {k: v for k, v in entries.items() if k.startswith(version)}
+
+    def _write_disk(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def optimal(self, team, track, rain_prob=0, total_laps=None, season=None, search='dp', monte_carlo=False,
+                seed=None, common_random_numbers=True):
+        total_laps = race_laps(track, season, total_laps)
+        policy = seed_policy(search, monte_carlo, seed, common_random_numbers)
+        version = self.db_version()
+        key = version + json.dumps([team, track, rain_prob, total_laps, season, policy])
+
+        if policy is not None:
+            with self._lock:
+                self._sync(version)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return OptimalStrategies(decode(entry['one_stop']), decode(entry['two_stop']),
+                                             entry['search_size'], True)
+
+        opt = StrategyOptimizer(team, track, rain_prob, total_laps, seed=seed, search=search,
+                                common_random_numbers=common_random_numbers, monte_carlo=monte_carlo,
+                                season=season)
+        entry = {'one_stop': encode(*opt.find_optimal_1_stop()), 'two_stop': encode(*opt.find_optimal_2_stop()),
+                 'search_size': opt.search_size()}
+
+        with self._lock:
+            self.misses += 1
+            if policy is not None:
+                self._sync(version)
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._write_disk()
+        return OptimalStrategies(decode(entry['one_stop']), decode(entry['two_stop']), entry['search_size'], False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._write_disk()
+
+
+STRATEGY_CACHE = StrategyCache(path=CACHE_PATH)
+
+
+def optimal_strategies(team, track, rain_prob=0, total_laps=None, season=None, **kwargs):
+    return STRATEGY_CACHE.optimal(team, track, rain_prob, total_laps, season, **kwargs)
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.params import DATA_DIR, DEFAULT_SEASON, DEFAULT_DEG_MULTIPLIERS, DEFAULT_CLIFFS, CLIFF_BASE
+from src.lap_store import STORE_DIR, has_season, load_laps, season_csv_dir, sync_season
+from src.profiler import FUEL_CORRECTION_PER_LAP, race_sources
+
+# Per-(track, compound) tyre curves: linear wear + a cliff past `cliff_onset`
+# (CLIFF_BASE * exp(cliff_rate * (age - onset))), fitted for every race of a season at once.
+#   python -m src.tyre_model --years 2023 2024   -> writes data/tyre_db.json
+TYRE_DB_PATH = os.path.join(DATA_DIR, 'tyre_db.json')
+FIT_COLUMNS = ['Driver', 'Stint', 'Compound', 'LapNumber', 'TyreLife', 'LapTimeSec']
+DRY_COMPOUNDS = list(DEFAULT_DEG_MULTIPLIERS)
+WET_COMPOUNDS = ['INTERMEDIATE', 'WET']
+
+# Laps slower than the stint median by more than this are traffic / SC / mistakes
+OUTLIER_MARGIN = 2.0
+# Linear phase of the fit (same window the track profile uses)
+LINEAR_MAX_AGE = 30
+# Shrinkage: the fitted slope counts as much as the prior only once sum((age - stint mean)^2)
+# reaches this (about three clean 20-lap stints)
+PRIOR_WEIGHT = 2000.0
+MIN_DEG, MAX_DEG = 0.005, 0.3
+
+# Cliff detection: mean residual above CLIFF_THRESHOLD on two consecutive ages (each with at
+# least MIN_AGE_LAPS laps), not before MIN_CLIFF_AGE (out-laps and cold tyres sit above the line too)
+CLIFF_THRESHOLD = 0.3
+MIN_AGE_LAPS = 5
+MIN_CLIFF_AGE = 10
+# No sustained upturn (or one before MIN_CLIFF_AGE) is no evidence: the curve keeps DEFAULT_CLIFFS.
+# Stint length is not used, it says when teams pitted (SC, strategy), not when the tyre gave up.
+MIN_STINTS = 8
+# Cliff rate used until at least 3 ages past the onset show the cliff
+PRIOR_RATE = 0.3
+# Races left out of the cliff fit: any wet running, or this share of race laps neutralised
+# (the clean CSVs drop SC / VSC / red-flag laps, so fewer than half the field has a lap time)
+NEUTRALISED_SHARE = 0.15
+MIN_RATE, MAX_RATE = 0.1, 1.0
+
+
+def load_fit_frame(year, store_dir=STORE_DIR):
+    if store_dir and has_season(year, store_dir):
+        sync_season(year, store_dir=store_dir)
+        df = load_laps(years=[year], columns=FIT_COLUMNS, store_dir=store_dir)
+    else:
+        frames = []
+        for gp, path in race_sources(year, season_csv_dir(year), None).items():
+            frames.append(pd.read_csv(path, usecols=lambda c: c in FIT_COLUMNS).assign(GP=gp))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FIT_COLUMNS + ['GP'])
+
+    df = df.dropna(subset=['TyreLife', 'LapTimeSec', 'Compound'])
+    df = df.assign(GP=df['GP'].astype(str), Compound=df['Compound'].astype(str),
+                   LapTimeSec=df['LapTimeSec'].astype('float64'))
+    disrupted = disrupted_races(df)
+    df = df[df['Compound'].isin(DRY_COMPOUNDS)]
+    return df.assign(Disrupted=df['GP'].isin(disrupted))
+
+
+def disrupted_races(df):
+    # GPs whose laps say little about tyre life: wet running or a heavily neutralised race
+    wet = df.loc[df['Compound'].isin(WET_COMPOUNDS), 'GP'].unique()
+    per_lap = df.groupby(['GP', 'LapNumber']).size()
+    field = df.groupby('GP')['Driver'].nunique()
+    race_laps = df.groupby('GP')['LapNumber'].max()
+    neutralised = {}
+    for gp, laps in race_laps.items():
+        counts = per_lap[gp].reindex(range(1, int(laps) + 1), fill_value=0)
+        neutralised[gp] = (counts < field[gp] / 2).mean()
+    heavy_sc = [gp for gp, share in neutralised.items() if share >= NEUTRALISED_SHARE]
+    return set(wet) | set(heavy_sc)
+
+
+def fit_curves(df):
+    # One row per (GP, Compound): deg, cliff_onset, cliff_rate, laps, stints, cliff_source.
+    # Every step is a groupby over all tracks at once.
+    stint = ['GP', 'Driver', 'Stint']
+    if 'Disrupted' not in df:
+        df = df.assign(Disrupted=False)
+    df = df.assign(y=df['LapTimeSec'] + df['LapNumber'] * FUEL_CORRECTION_PER_LAP)
+    df = df[df['y'] < df.groupby(stint, observed=True)['y'].transform('median') + OUTLIER_MARGIN]
+
+    # --- 1. LINEAR PHASE: within-stint slope (removes driver / car pace differences) ---
+    lin = df[df['TyreLife'] < LINEAR_MAX_AGE]
+    g = lin.groupby(stint, observed=True)
+    xd = lin['TyreLife'] - g['TyreLife'].transform('mean')
+    yd = lin['y'] - g['y'].transform('mean')
+    sums = pd.DataFrame({'GP': lin['GP'], 'Compound': lin['Compound'], 'sxy': xd * yd, 'sxx': xd * xd}) \
+        .groupby(['GP', 'Compound'])[['sxy', 'sxx']].sum()
+
+    # Prior: the track's pooled slope x the old compound multipliers
+    track = sums.groupby(level='GP').sum()
+    track_deg = (track['sxy'] / track['sxx']).clip(lower=0.01)
+    prior = track_deg.reindex(sums.index.get_level_values('GP')).to_numpy() * \
+        sums.index.get_level_values('Compound').map(DEFAULT_DEG_MULTIPLIERS).to_numpy(dtype=float)
+    curves = pd.DataFrame(index=sums.index)
+    curves['deg'] = ((sums['sxy'] + PRIOR_WEIGHT * prior) / (sums['sxx'] + PRIOR_WEIGHT)).clip(MIN_DEG, MAX_DEG)
+
+    # --- 2. CLIFF ONSET (dry, mostly green races only) ---
+    # Residual of every lap against its stint's linear fit, averaged per tyre age
+    curves['laps'] = df.groupby(['GP', 'Compound']).size()
+    curves['stints'] = df.groupby(stint + ['Compound'], observed=True).size().groupby(['GP', 'Compound']).size()
+    clean = df[~df['Disrupted']]
+    g = clean.groupby(stint, observed=True)
+    deg = curves['deg'].reindex(pd.MultiIndex.from_arrays([clean['GP'], clean['Compound']])).to_numpy()
+    resid = (clean['y'] - g['y'].transform('mean')) - deg * (clean['TyreLife'] - g['TyreLife'].transform('mean'))
+    by_age = pd.DataFrame({'GP': clean['GP'], 'Compound': clean['Compound'], 'age': clean['TyreLife'].astype(int),
+                           'r': resid}).groupby(['GP', 'Compound', 'age'])['r'].agg(['mean', 'count']).reset_index()
+    by_age = by_age[by_age['count'] >= MIN_AGE_LAPS]
+
+    groups = [by_age['GP'], by_age['Compound']]
+    above = (by_age['mean'] > CLIFF_THRESHOLD) & (by_age['age'] >= MIN_CLIFF_AGE)
+    next_age = by_age['age'].groupby(groups).shift(-1)
+    next_above = above.groupby(groups).shift(-1, fill_value=False)
+    sustained = above & next_above & next_age.eq(by_age['age'] + 1)
+    first_over = by_age[sustained].groupby(['GP', 'Compound'])['age'].min()
+
+    # CLIFF_THRESHOLD is crossed ln(threshold / base) / rate laps after the onset.
+    # Onsets that land before MIN_CLIFF_AGE are rejected, not clipped.
+    detected = (first_over.reindex(curves.index) - np.log(CLIFF_THRESHOLD / CLIFF_BASE) / PRIOR_RATE).round()
+    detected = detected.where(detected >= MIN_CLIFF_AGE)
+    curves['cliff_onset'] = detected
+    curves['cliff_source'] = np.where(detected.notna(), 'residual', 'prior')
+
+    # --- 3. CLIFF RATE: log-linear fit of the residual past the onset, through (onset, CLIFF_BASE) ---
+    by_age = by_age.join(curves['cliff_onset'], on=['GP', 'Compound'])
+    tail = by_age[(by_age['age'] > by_age['cliff_onset']) & (by_age['mean'] > CLIFF_BASE)]
+    d = tail['age'] - tail['cliff_onset']
+    rate_sums = pd.DataFrame({'GP': tail['GP'], 'Compound': tail['Compound'], 'n': 1,
+                              'sdl': d * np.log(tail['mean'] / CLIFF_BASE), 'sdd': d * d}) \
+        .groupby(['GP', 'Compound'])[['n', 'sdl', 'sdd']].sum().reindex(curves.index)
+    fitted_rate = (rate_sums['sdl'] / rate_sums['sdd']).clip(MIN_RATE, MAX_RATE)
+    curves['cliff_rate'] = np.where(rate_sums['n'] >= 3, fitted_rate, PRIOR_RATE)
+
+    # No cliff evidence, or too few stints to trust it: keep the old model's constants (no cliff on HARD)
+    prior = (curves['cliff_source'] == 'prior') | (curves['stints'] < MIN_STINTS)
+    compounds = curves.index.get_level_values('Compound')
+    prior_onset = compounds.map(lambda c: DEFAULT_CLIFFS[c][0]).to_numpy(dtype=float)
+    prior_rate = compounds.map(lambda c: DEFAULT_CLIFFS[c][1]).to_numpy(dtype=float)
+    mask = prior.to_numpy()
+    curves.loc[prior, 'cliff_onset'] = prior_onset[mask]
+    curves.loc[prior, 'cliff_rate'] = prior_rate[mask]
+    curves.loc[prior, 'cliff_source'] = 'prior'
+    return curves
+
+
+def to_tyre_db(curves):
+    # {track: {compound: curve}} as stored in tyre_db.json (cliff_onset null = no cliff)
+    db = {}
+    for (gp, compound), row in curves.iterrows():
+        onset = None if pd.isna(row['cliff_onset']) else int(row['cliff_onset'])
+        db.setdefault(gp, {})[compound] = {
+            'deg': round(float(row['deg']), 5),
+            'cliff_onset': onset,
+            'cliff_rate': round(float(row['cliff_rate']), 4),
+            'cliff_source': row['cliff_source'],
+            'laps': int(row['laps']),
+            'stints': int(row['stints']),
+        }
+    return db
+
+
+def fit_seasons(years=(DEFAULT_SEASON,), path=TYRE_DB_PATH, store_dir=STORE_DIR):
+    # Fits and merges the seasons into tyre_db.json ({"<year>": {track: {compound: curve}}})
+    tyre_db = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            tyre_db = json.load(f)
+
+    for year in years:
+        df = load_fit_frame(year, store_dir)
+        if df.empty:
+            print(f"[WARNING] No lap data for {year}")
+            continue
+        tyre_db[str(year)] = to_tyre_db(fit_curves(df))
+        print(f"[FITTED] {year}: {len(tyre_db[str(year)])} tracks")
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(sorted(tyre_db.items())), f, indent=4)
+    os.replace(tmp_path, path)
+    return tyre_db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit per-track, per-compound tyre degradation curves.")
+    parser.add_argument('--years', nargs='+', type=int, default=[DEFAULT_SEASON])
+    args = parser.parse_args(argv)
+    fit_seasons(args.years)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import sys
+import threading
+from collections import namedtuple
+import numpy as np
+from src.grid import GridRaceEngine
+from src.params import PARAMS, race_laps
+from src.simulation import make_rng
+from src.strategy import StrategyOptimizer
+
+# Two-car pit game: hero and rival each pick a 1-stop plan (stop lap x tyre combo) and race
+# each other on the grid simulator, so undercuts / overcuts and track position count.
+#   python -m src.undercut --hero Ferrari --rival Mercedes --track Bahrain
+# Payoff = mean(hero time - rival time) over common random races: hero minimises, rival maximises.
+# The whole matrix is raced in NumPy batches and cached per (team pair, track, rain, ...).
+
+DEFAULT_RACES = 32
+SEED = 2023
+CHUNK_ROWS = 20000  # (pair, race) rows raced per batch, bounds memory
+# Fictitious-play rounds when plain best responses cycle (no pure equilibrium)
+PLAY_ROUNDS = 2000
+
+Equilibrium = namedtuple('Equilibrium', ['hero_strategy', 'rival_strategy', 'delta', 'hero_ahead', 'converged',
+                                         'iterations', 'hero_undercut', 'hero_overcut', 'rival_undercut',
+                                         'rival_overcut'])
+
+
+def lap_ranges(laps, step=1):
+    # Laps no more than `step` apart (the candidate grid spacing) form one window:
+    # step=1: [20, 21, 22, 25] -> [(20, 22), (25, 25)], step=2: [23, 25, 27, 31] -> [(23, 27), (31, 31)]
+    ranges = []
+    for lap in sorted(laps):
+        if ranges and lap - ranges[-1][1] <= step:
+            ranges[-1] = (ranges[-1][0], lap)
+        else:
+            ranges.append((lap, lap))
+    return ranges
+
+
+def format_ranges(ranges):
+    return ", ".join(f"L{a}" if a == b else f"L{a}-{b}" for a, b in ranges) or "none"
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+class UndercutSolver:
+    def __init__(self, hero, rival, track, rain_prob=0, total_laps=None, season=None, step=2,
+                 n_races=DEFAULT_RACES, seed=SEED):
+        self.hero = hero
+        self.rival = rival
+        self.track = track
+        self.rain_prob = rain_prob
+        self.season = season
+        self.total_laps = race_laps(track, season, total_laps)
+        self.step = step
+        self.n_races = n_races
+        self.seed = seed
+
+        # Same candidate grid for both cars: the optimizer's (track-scaled) 1-stop windows
+        self.candidates = StrategyOptimizer(hero, track, rain_prob, self.total_laps,
+                                            season=season).one_stop_candidates(step)
+
+        # Faster car (lower pace_index) starts ahead
+        team_db = PARAMS.team_db(season)
+        entries = [('hero', hero, self.candidates[0]), ('rival', rival, self.candidates[0])]
+        if team_db[rival]['pace_index'] < team_db[hero]['pace_index']:
+            entries.reverse()
+        self.engine = GridRaceEngine(track, entries, rain_prob, self.total_laps, season)
+        self.hero_col = 0 if entries[0][0] == 'hero' else 1
+        self.rival_col = 1 - self.hero_col
+
+    def cache_key(self):
+        return (self.season, self.hero, self.rival, self.track, self.rain_prob, self.total_laps, self.step,
+                self.n_races, self.seed)
+
+    def payoff_matrix(self, progress=None):
+        # (delta, hero_ahead), both (hero candidates, rival candidates):
+        # mean hero - rival race time in seconds, share of races the hero finishes in front.
+        # progress(fraction) is called after every batch; raising from it aborts.
+        key = self.cache_key()
+        version = PARAMS.version()
+        with _matrices_lock:
+            cached = _matrices.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        matrices = self.race_pairs(progress)
+        with _matrices_lock:
+            _matrices[key] = (version, matrices)
+        return matrices
+
+    def race_pairs(self, progress=None):
+        engine = self.engine
+        hero_comp, hero_box = engine.engines[self.hero].build_schedule(self.candidates)
+        rival_comp, rival_box = engine.engines[self.rival].build_schedule(self.candidates)
+        draws = engine.draw_randomness(make_rng(self.seed), self.n_races)
+
+        n = len(self.candidates)
+        pairs = np.indices((n, n)).reshape(2, -1).T  # row-major: pair k = (k // n, k % n)
+        delta = np.empty(len(pairs))
+        ahead = np.empty(len(pairs))
+        per_chunk = max(1, CHUNK_ROWS // self.n_races)
+        races = np.arange(self.n_races)
+
+        for start in range(0, len(pairs), per_chunk):
+            chunk = pairs[start:start + per_chunk]
+            h = np.repeat(chunk[:, 0], self.n_races)
+            r = np.repeat(chunk[:, 1], self.n_races)
+            compound = np.empty((len(h), 2, self.total_laps), dtype=np.int8)
+            boxing = np.empty((len(h), 2, self.total_laps), dtype=bool)
+            compound[:, self.hero_col], boxing[:, self.hero_col] = hero_comp[h], hero_box[h]
+            compound[:, self.rival_col], boxing[:, self.rival_col] = rival_comp[r], rival_box[r]
+
+            # Common random numbers: every pair races the same n_races races
+            rows = np.tile(races, len(chunk))
+            chunk_draws = tuple(None if d is None else d[rows] for d in draws)
+            lap_times, positions, _, _ = engine.race(compound, boxing, chunk_draws)
+
+            totals = lap_times.sum(axis=2)
+            gap = (totals[:, self.hero_col] - totals[:, self.rival_col]).reshape(len(chunk), self.n_races)
+            front = (positions[:, self.hero_col, -1] < positions[:, self.rival_col, -1])
+            delta[start:start + len(chunk)] = gap.mean(axis=1)
+            ahead[start:start + len(chunk)] = front.reshape(len(chunk), self.n_races).mean(axis=1)
+            if progress is not None:
+                progress((start + len(chunk)) / len(pairs))
+
+        return delta.reshape(n, n), ahead.reshape(n, n)
+
+    def nearest_candidate(self, strategy):
+        # Index of the grid plan closest to (lap, combo); any combo if that one isn't on the grid
+        lap, combo = strategy
+        same = [i for i, (l, c) in enumerate(self.candidates) if c == list(combo)]
+        pool = same or range(len(self.candidates))
+        return min(pool, key=lambda i: abs(self.candidates[i][0] - lap))
+
+    def independent_start(self):
+        # Each car's own best 1-stop plan, ignoring the other car
+        from src.strategy_cache import optimal_strategies
+        hero = optimal_strategies(self.hero, self.track, self.rain_prob, self.total_laps, self.season).one_stop
+        rival = optimal_strategies(self.rival, self.track, self.rain_prob, self.total_laps, self.season).one_stop
+        return self.nearest_candidate(hero[1]), self.nearest_candidate(rival[1])
+
+    def solve(self, max_iter=50, progress=None):
+        delta, ahead = self.payoff_matrix(progress)
+        i, j = self.independent_start()
+        seen = set()
+        converged = False
+
+        # --- BEST RESPONSES (current plan kept on ties) ---
+        iterations = 0
+        while iterations < max_iter and (i, j) not in seen:
+            seen.add((i, j))
+            iterations += 1
+            best_i = int(delta[:, j].argmin())
+            if delta[i, j] <= delta[best_i, j]:
+                best_i = i
+            best_j = int(delta[best_i, :].argmax())
+            if delta[best_i, j] >= delta[best_i, best_j]:
+                best_j = j
+            if (best_i, best_j) == (i, j):
+                converged = True
+                break
+            i, j = best_i, best_j
+
+        if not converged:
+            # Best responses cycle: keep responding to the opponent's play so far instead
+            # (fictitious play, converges to the mixed equilibrium of a zero-sum game)
+            # and report each side's most played plan
+            hero_counts = np.zeros(len(self.candidates))
+            rival_counts = np.zeros(len(self.candidates))
+            hero_counts[i] += 1
+            rival_counts[j] += 1
+            for _ in range(PLAY_ROUNDS):
+                hero_counts[int((delta @ rival_counts).argmin())] += 1
+                rival_counts[int((hero_counts @ delta).argmax())] += 1
+            iterations += PLAY_ROUNDS
+            i, j = int(hero_counts.argmax()), int(rival_counts.argmax())
+
+        hero_plan, rival_plan = self.candidates[i], self.candidates[j]
+        hero_under, hero_over = self.windows(delta[:, j], hero_plan, rival_plan[0], better=np.less)
+        rival_under, rival_over = self.windows(delta[i, :], rival_plan, hero_plan[0], better=np.greater)
+        return Equilibrium(hero_plan, rival_plan, float(delta[i, j]), float(ahead[i, j]), converged, iterations,
+                           hero_under, hero_over, rival_under, rival_over)
+
+    def windows(self, payoffs, plan, other_lap, better):
+        # Stop laps (same tyres as `plan`) that beat boxing on the other car's lap:
+        # earlier ones are the undercut window, later ones the overcut window
+        laps = {lap: payoffs[k] for k, (lap, combo) in enumerate(self.candidates) if combo == plan[1]}
+        cover = laps[min(laps, key=lambda lap: abs(lap - other_lap))]
+        undercut = [lap for lap, p in laps.items() if lap < other_lap and better(p, cover)]
+        overcut = [lap for lap, p in laps.items() if lap > other_lap and better(p, cover)]
+        return lap_ranges(undercut, self.step), lap_ranges(overcut, self.step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the pit-stop game between two teams.")
+    parser.add_argument('--hero', required=True)
+    parser.add_argument('--rival', required=True)
+    parser.add_argument('--track', default='Bahrain')
+    parser.add_argument('--rain', type=int, default=0)
+    parser.add_argument('--season', type=int, default=None)
+    parser.add_argument('--races', type=int, default=DEFAULT_RACES, help="Races per cell of the payoff matrix")
+    parser.add_argument('--step', type=int, default=2, help="Stop-lap spacing of the candidate grid")
+    args = parser.parse_args(argv)
+
+    solver = UndercutSolver(args.hero, args.rival, args.track, args.rain, season=args.season, step=args.step,
+                            n_races=args.races)
+    eq = solver.solve()
+    print(f"--- {args.hero} vs {args.rival} @ {args.track}: {len(solver.candidates)}^2 plans x {args.races} races ---")
+    print(f"{'Pure equilibrium' if eq.converged else 'Mixed equilibrium, most played plans'} "
+          f"after {eq.iterations} rounds")
+    print(f"{args.hero}: box L{eq.hero_strategy[0]} {eq.hero_strategy[1]} | "
+          f"undercut {format_ranges(eq.hero_undercut)} | overcut {format_ranges(eq.hero_overcut)}")
+    print(f"{args.rival}: box L{eq.rival_strategy[0]} {eq.rival_strategy[1]} | "
+          f"undercut {format_ranges(eq.rival_undercut)} | overcut {format_ranges(eq.rival_overcut)}")
+    print(f"Gap: {eq.delta:+.2f}s | {args.hero} ahead in {eq.hero_ahead * 100:.0f}% of races")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,34 @@
-import fastf1
+import os
 import pandas as pd
 import numpy as np
+from src.params import DATA_DIR
 
-# Enable cache
-fastf1.Cache.enable_cache('../data/cache')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+_fastf1 = None
 
 
-def get_race_data(year, gp, session_type='R'):
+def get_fastf1():
+    # fastf1 is imported (and its cache enabled) on the first download, not at import time
+    global _fastf1
+    if _fastf1 is None:
+        import fastf1
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fastf1.Cache.enable_cache(CACHE_DIR)
+        _fastf1 = fastf1
+    return _fastf1
+
+
+def fastf1_loader(year, gp, session_type='R'):
+    # Default session loader. Any callable with this signature returning an object with
+    # .load() and a .laps DataFrame can stand in for it (see src/data_miner.py).
+    return get_fastf1().get_session(year, gp, session_type)
+
+
+def get_race_data(year, gp, session_type='R', loader=None):
     print(f"Loading {year} {gp}...")
+    loader = loader or fastf1_loader
     try:
-        session = fastf1.get_session(year, gp, session_type)
+        session = loader(year, gp, session_type)
         session.load()
     except Exception as e:
         print(f"Error loading session: {e}")